@@ -1,41 +1,275 @@
 
+import hashlib
+import json
+import os
+from urllib.parse import urlparse
+
 import requests
-from io import StringIO
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
-import random
-import plotly.graph_objects as go
-import plotly.subplots as sp
-
-def download_csv(url):
-    response = requests.get(url)
-    if response.status_code == 200:
-        return StringIO(response.text)
-    else:
-        return None
+
+DATASET_CACHE_DIR = os.path.join('.data_cache', 'datasets')
+
+def _cache_paths(url, cache_dir):
+    name = os.path.basename(urlparse(url).path) or 'dataset'
+    stem = f"{hashlib.sha1(url.encode()).hexdigest()[:12]}_{name}"
+    return os.path.join(cache_dir, stem), os.path.join(cache_dir, stem + '.json')
+
+def fetch_dataset(source, cache_dir=DATASET_CACHE_DIR, offline=False, timeout=30, retries=3, chunk_size=1 << 16):
+    """
+    Returns a local path for `source`, downloading it into `cache_dir` only when needed.
+
+    Local paths and file:// URLs (e.g. test fixtures) are returned as-is. For HTTP sources the cached
+    copy is revalidated with If-None-Match/If-Modified-Since from the stored ETag/Last-Modified, and
+    a changed body is streamed to disk in chunks. With `offline=True`, or if the network fails, the
+    cached copy is used without contacting the server.
+    """
+    parsed = urlparse(source)
+    if parsed.scheme == 'file':
+        return parsed.path
+    if parsed.scheme not in ('http', 'https'):
+        return source
+
+    data_path, meta_path = _cache_paths(source, cache_dir)
+    meta = {}
+    if os.path.exists(data_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    if offline:
+        if not meta:
+            raise FileNotFoundError(f"{source} is not cached in {cache_dir} and offline mode is on")
+        return data_path
+
+    headers = {}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+    session.mount('http://', HTTPAdapter(max_retries=retry))
+    session.mount('https://', HTTPAdapter(max_retries=retry))
+    try:
+        with session.get(source, headers=headers, stream=True, timeout=timeout) as response:
+            if response.status_code == 304:
+                return data_path
+            response.raise_for_status()
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = data_path + '.part'
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size):
+                    f.write(chunk)
+            os.replace(tmp_path, data_path)
+            with open(meta_path, 'w') as f:
+                json.dump({'url': source,
+                           'etag': response.headers.get('ETag'),
+                           'last_modified': response.headers.get('Last-Modified')}, f)
+    except requests.RequestException:
+        if meta:
+            return data_path
+        raise
+    finally:
+        session.close()
+    return data_path
+
+def download_csv(url, **kwargs):
+    return fetch_dataset(url, **kwargs)
 
 def switch_coordinates(coord_str):
     coords = coord_str.split(', ')
     return float(coords[1]), float(coords[0])
 
-def get_airport_codes(csv_url):
-    csv_file = download_csv(csv_url)
-    airport_codes = pd.read_csv(csv_file)[['iata_code', 'coordinates']].dropna().reset_index(drop=True)
-    airport_codes[['latitude', 'longitude']] = airport_codes['coordinates'].apply(switch_coordinates).apply(pd.Series)
-    airport_codes['dummy_values'] = airport_codes.apply(lambda row: random.randint(1000, 20000), axis=1)
+def get_airport_codes(csv_url, offline=False, cache_dir=DATASET_CACHE_DIR):
+    return parse_airport_codes(download_csv(csv_url, offline=offline, cache_dir=cache_dir))
+
+def parse_airport_codes(csv_file, seed=None):
+    airport_codes = pd.read_csv(csv_file, usecols=['iata_code', 'coordinates']).dropna().reset_index(drop=True)
+    # coordinates are 'longitude, latitude' strings; split them in one pass instead of per row
+    coords = airport_codes['coordinates'].str.split(',', n=1, expand=True)
+    airport_codes['latitude'] = coords[1].astype(np.float32)
+    airport_codes['longitude'] = coords[0].astype(np.float32)
+    airport_codes['iata_code'] = airport_codes['iata_code'].astype('category')
+    airport_codes['dummy_values'] = np.random.default_rng(seed).integers(1000, 20001, len(airport_codes), dtype=np.int32)
     return airport_codes
 
-def merge_dataframes(airport_codes, new_data, on_key='iata_code'):
-    merged_data = airport_codes.merge(new_data, on=on_key, how='left')
+class AirportIndex:
+    """
+    Hash index over the airport table for repeated code lookups.
+
+    One index is built per code column present (IATA, and ICAO/ident/GPS codes when the table has
+    them), keyed on the upper-cased code and pointing at the first matching row. Lookups accept a
+    single code or an array of codes and cost one hash probe per code instead of a table scan.
+    """
+    KEY_COLUMNS = ('iata_code', 'icao_code', 'ident', 'gps_code')
+
+    def __init__(self, airport_codes, key_columns=None):
+        self.airport_codes = airport_codes.reset_index(drop=True)
+        key_columns = key_columns or [col for col in self.KEY_COLUMNS if col in self.airport_codes.columns]
+        self.indexes = {}
+        for col in key_columns:
+            codes = self.airport_codes[col].astype('string').str.upper()
+            present = codes.notna() & ~codes.duplicated()
+            self.indexes[col] = (pd.Index(codes[present].to_numpy(dtype=object)), np.flatnonzero(present))
+
+    def positions(self, codes, key='iata_code'):
+        """Row positions of `codes` in the airport table, -1 where a code is unknown."""
+        index, rows = self.indexes[key]
+        codes = pd.Series(np.atleast_1d(codes), dtype='string').str.upper().to_numpy(dtype=object)
+        found = index.get_indexer(codes)
+        return np.where(found >= 0, rows[found], -1)
+
+    def missing_mask(self, codes, key='iata_code'):
+        return self.positions(codes, key) < 0
+
+    def lookup(self, codes, key='iata_code'):
+        """Airport rows for `codes`, in input order; unknown codes give all-NaN rows."""
+        codes = np.atleast_1d(codes)
+        result = self.airport_codes.reindex(self.positions(codes, key))
+        result.index = pd.Index(codes, name='query_code')
+        return result
+
+    def locate(self, code, key='iata_code'):
+        position = self.positions(code, key)[0]
+        return self.airport_codes.iloc[[position]] if position >= 0 else self.airport_codes.iloc[[]]
+
+    def save(self, path):
+        pd.to_pickle(self, path)
+
+    @staticmethod
+    def load(path):
+        return pd.read_pickle(path)
+
+EARTH_RADIUS_KM = 6371.0088
+
+def _unit_vectors(latitude, longitude):
+    lat = np.radians(np.asarray(latitude, dtype=np.float64))
+    lon = np.radians(np.asarray(longitude, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+def _chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+def _km_to_chord(distance_km):
+    return 2 * np.sin(np.minimum(distance_km / (2 * EARTH_RADIUS_KM), np.pi / 2))
+
+class AirportSpatialIndex:
+    """
+    k-d tree over airport positions on the unit sphere. Straight-line (chord) distance between unit
+    vectors is monotonic in great-circle distance, so nearest/radius queries on the tree are exact
+    haversine queries. Queries are batched and vectorized, and run on all cores with `workers=-1`.
+    """
+
+    def __init__(self, airport_codes, lat_col='latitude', lon_col='longitude'):
+        from scipy.spatial import cKDTree
+
+        self.airport_codes = airport_codes.reset_index(drop=True)
+        self.tree = cKDTree(_unit_vectors(self.airport_codes[lat_col], self.airport_codes[lon_col]))
+
+    def nearest(self, latitude, longitude, k=1, max_distance_km=None, workers=-1):
+        """
+        Distances (km) and row positions of the `k` nearest airports to each point, shaped (n,) for
+        k=1 and (n, k) otherwise. Neighbours beyond `max_distance_km`, and points with a missing or
+        non-finite coordinate, get distance NaN and position -1.
+        """
+        upper_bound = np.inf if max_distance_km is None else _km_to_chord(max_distance_km)
+        with np.errstate(invalid='ignore'):
+            points = _unit_vectors(latitude, longitude)
+        finite = np.isfinite(points).all(axis=1)
+        shape = (len(points),) if k == 1 else (len(points), k)
+        distances = np.full(shape, np.nan)
+        positions = np.full(shape, -1, dtype=np.int64)
+        if finite.any():
+            chord, found = self.tree.query(points[finite], k=k, distance_upper_bound=upper_bound, workers=workers)
+            missing = found >= self.tree.n
+            distances[finite] = np.where(missing, np.nan, _chord_to_km(np.where(missing, 0, chord)))
+            positions[finite] = np.where(missing, -1, found)
+        return distances, positions
+
+    def within_radius(self, latitude, longitude, radius_km, workers=-1):
+        """Row positions of all airports within `radius_km` of each point, one array per point (empty if not finite)."""
+        with np.errstate(invalid='ignore'):
+            points = _unit_vectors(latitude, longitude)
+        finite = np.isfinite(points).all(axis=1)
+        found = iter(self.tree.query_ball_point(points[finite], _km_to_chord(radius_km), workers=workers,
+                                                return_sorted=True) if finite.any() else ())
+        return [np.asarray(next(found), dtype=np.int64) if ok else np.empty(0, dtype=np.int64) for ok in finite]
+
+def merge_dataframes(airport_codes, new_data, on_key='iata_code', how='key', lat_col='latitude', lon_col='longitude',
+                     max_distance_km=None, spatial_index=None):
+    """
+    Joins `new_data` to the airport table.
+
+    how='key' left-joins the airport table with `new_data` on `on_key` (the original behaviour).
+    how='nearest' maps every row of `new_data` (e.g. GPS pings with `lat_col`/`lon_col`) to its nearest
+    airport, adding the airport columns (suffixed '_airport' on clashes) and a `distance_km` column;
+    rows with no airport within `max_distance_km`, or without finite coordinates, get NaN airport
+    columns and a NaN distance. Pass a prebuilt
+    `spatial_index` to reuse it across calls.
+    """
+    if how == 'key':
+        merged_data = airport_codes.merge(new_data, on=on_key, how='left')
+        return merged_data
+    if how != 'nearest':
+        raise ValueError(f"how must be 'key' or 'nearest', got {how!r}")
+
+    spatial_index = spatial_index or AirportSpatialIndex(airport_codes)
+    distances, positions = spatial_index.nearest(new_data[lat_col], new_data[lon_col], max_distance_km=max_distance_km)
+    airports = spatial_index.airport_codes.reindex(positions).reset_index(drop=True)
+    airports = airports.rename(columns={col: f'{col}_airport' for col in airports.columns if col in new_data.columns})
+    merged_data = pd.concat([new_data.reset_index(drop=True), airports], axis=1)
+    merged_data['distance_km'] = distances
     return merged_data
 
 def find_missing_keys(airport_codes, new_data, key='iata_code'):
+    if isinstance(airport_codes, AirportIndex):
+        codes = new_data[key].to_numpy()
+        return set(codes[airport_codes.missing_mask(codes, key)])
     missing_keys = set(new_data[key]) - set(airport_codes[key])
     return missing_keys
 
 def airport_locator(airport_codes, iata_code):
+    if isinstance(airport_codes, AirportIndex):
+        return airport_codes.locate(iata_code)
     return airport_codes.loc[airport_codes['iata_code'] == iata_code.upper()]
 
-def plot_airport_map(airport_codes):
+def _geo_arrays(df, coordinate_decimals):
+    lat = df['latitude'].to_numpy(dtype=np.float32)
+    lon = df['longitude'].to_numpy(dtype=np.float32)
+    if coordinate_decimals is not None:
+        lat, lon = lat.round(coordinate_decimals), lon.round(coordinate_decimals)
+    return lat, lon
+
+def _grid_density(df, bin_deg):
+    """Aggregates airports into bin_deg x bin_deg cells: mean position, airport count and value sum per cell."""
+    cell_lat = np.floor(df['latitude'].to_numpy(dtype=np.float64) / bin_deg).astype(np.int64)
+    cell_lon = np.floor(df['longitude'].to_numpy(dtype=np.float64) / bin_deg).astype(np.int64)
+    _, cell, counts = np.unique(np.column_stack((cell_lat, cell_lon)), axis=0, return_inverse=True, return_counts=True)
+    cell = cell.ravel()
+    return pd.DataFrame({
+        'latitude': np.bincount(cell, df['latitude'].to_numpy(dtype=np.float64)) / counts,
+        'longitude': np.bincount(cell, df['longitude'].to_numpy(dtype=np.float64)) / counts,
+        'count': counts,
+        'dummy_values': np.bincount(cell, df['dummy_values'].to_numpy(dtype=np.float64)),
+    })
+
+def plot_airport_map(airport_codes, label_top_n=None, density_bin_deg=None, coordinate_decimals=None, show=True):
+    """
+    Plots airports on a world map, marker size following dummy_values, with the top 10% in red.
+
+    For large tables: `label_top_n` draws code labels only for the N largest airports instead of all of
+    them, `density_bin_deg` aggregates the other 90% into grid cells of that size (one marker per
+    cell), and `coordinate_decimals` rounds coordinates. Coordinates and sizes are passed as float32
+    NumPy arrays, which Plotly serializes as compact typed arrays, and hover text is built per column
+    rather than per row. With `show=False` the figure is only returned, for headless report building.
+    """
+    import plotly.graph_objects as go
+
+    label_all = label_top_n is None
+
     # Calculate the threshold for the top 10% values
     top_10_percent_threshold = airport_codes['dummy_values'].quantile(0.9)
 
@@ -67,34 +301,54 @@ def plot_airport_map(airport_codes):
     # ), row=1, col=1)
 
     # Add a trace for the rest of the data
-    fig.add_trace(go.Scattergeo(
-        lat=rest_data['latitude'],
-        lon=rest_data['longitude'],
-        text=rest_data.apply(lambda row: f"{row['iata_code']}", axis=1),
-        hoverinfo='text',
-        mode='markers+text',
-        textposition='bottom center',
-        textfont=dict(color='darkblue'),
-        marker=dict(
-            size=rest_data['dummy_values'] / 1000,
-            color='darkblue',
-            opacity=0.8,
-            sizemode='diameter'
-        ),
-        name='Rest'
-    ))
+    if density_bin_deg is not None:
+        cells = _grid_density(rest_data, density_bin_deg)
+        lat, lon = _geo_arrays(cells, coordinate_decimals)
+        fig.add_trace(go.Scattergeo(
+            lat=lat,
+            lon=lon,
+            text=cells['count'].astype(str).radd('airports: ').to_numpy(),
+            hoverinfo='text',
+            mode='markers',
+            marker=dict(
+                size=np.sqrt(cells['dummy_values'].to_numpy(dtype=np.float32)) / 30,
+                color='darkblue',
+                opacity=0.5,
+                sizemode='diameter'
+            ),
+            name='Rest (density)'
+        ))
+    else:
+        lat, lon = _geo_arrays(rest_data, coordinate_decimals)
+        fig.add_trace(go.Scattergeo(
+            lat=lat,
+            lon=lon,
+            text=rest_data['iata_code'].astype(str).to_numpy(),
+            hoverinfo='text',
+            mode='markers+text' if label_all else 'markers',
+            textposition='bottom center',
+            textfont=dict(color='darkblue'),
+            marker=dict(
+                size=rest_data['dummy_values'].to_numpy(dtype=np.float32) / 1000,
+                color='darkblue',
+                opacity=0.8,
+                sizemode='diameter'
+            ),
+            name='Rest'
+        ))
 
     # Add a trace for the top 10% data
+    lat, lon = _geo_arrays(top_10_percent_data, coordinate_decimals)
     fig.add_trace(go.Scattergeo(
-        lat=top_10_percent_data['latitude'],
-        lon=top_10_percent_data['longitude'],
-        text=top_10_percent_data.apply(lambda row: f"{row['iata_code']}", axis=1),
+        lat=lat,
+        lon=lon,
+        text=top_10_percent_data['iata_code'].astype(str).to_numpy(),
         hoverinfo='text',
-        mode='markers+text',
+        mode='markers+text' if label_all else 'markers',
         textposition='bottom center',
         textfont=dict(color='red'),
         marker=dict(
-            size=top_10_percent_data['dummy_values'] / 1000,
+            size=top_10_percent_data['dummy_values'].to_numpy(dtype=np.float32) / 1000,
             color='red',
             opacity=0.8,
             sizemode='diameter'
@@ -102,6 +356,21 @@ def plot_airport_map(airport_codes):
         name='Top 10%'
     ))
 
+    # Labels only for the largest airports
+    if not label_all and label_top_n > 0:
+        labelled = airport_codes.nlargest(label_top_n, 'dummy_values')
+        lat, lon = _geo_arrays(labelled, coordinate_decimals)
+        fig.add_trace(go.Scattergeo(
+            lat=lat,
+            lon=lon,
+            text=labelled['iata_code'].astype(str).to_numpy(),
+            hoverinfo='skip',
+            mode='text',
+            textposition='bottom center',
+            textfont=dict(color='red'),
+            showlegend=False
+        ))
+
     # Rest of the layout code remains the same
     fig.update_layout(
         title='World Map of Airport Coordinates and Dummy Values',
@@ -122,7 +391,9 @@ def plot_airport_map(airport_codes):
         )
     )
 
-    fig.show()
+    if show:
+        fig.show()
+    return fig
 
 if __name__ == "__main__":
     csv_url = 'https://datahub.io/core/airport-codes/r/airport-codes.csv'
@@ -141,4 +412,4 @@ if __name__ == "__main__":
     print(result)
 
     # Plot the airport map
-    plot_airport_map(airport_codes.head(50))
+    plot_airport_map(airport_codes, label_top_n=100, density_bin_deg=2)
@@ -0,0 +1,15 @@
+"""
+Compute-only core of the band and z-score scripts.
+
+Importing this package (or one of its modules) loads pandas and nothing else heavy, so batch jobs,
+workers and notebooks can run the scans without paying for Plotly, Streamlit or SciPy at startup.
+bollinger_band.py and z-score_control.py import their compute functions from here.
+"""
+from analysis_core.bands import (
+    aggregate_all_data, aggregate_revision_data, aggregate_revision_data_parallel, calculate_bollinger_bands,
+    calculate_differences, calculate_grouped_bollinger_bands, detect_bb_breach, find_products_needing_revision,
+    split_dataframe, summarize_revisions,
+)
+from analysis_core.zscore import (
+    Z_SCORE_THRESHOLD, calculate_grouped_z_scores, calculate_z_scores, clip_tail_values, process_data_parallel,
+)
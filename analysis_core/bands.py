@@ -0,0 +1,121 @@
+"""Bollinger band computations used by bollinger_band.py, importable without Plotly or Streamlit."""
+import pandas as pd
+
+from parallel_scan import run_chunked
+
+def split_dataframe(df):
+    return {name: group for name, group in df.groupby(['product', 'location'], observed=True)}
+
+def detect_bb_breach(df):
+    return df['value'].iloc[-1] > df['upper_band'].iloc[-1]
+
+def trim_values(df):
+    df_original = df.copy()
+    original_last_value = df['value'].iloc[-1]
+
+    if detect_bb_breach(df):
+        delta_percentage = df['upper_band'].iloc[-1] / df['value'].iloc[-1]
+        df['value'] *= delta_percentage
+        message = "Data points have been proportionally trimmed down."
+    else:
+        message = "The last data point has not passed the upper band, no trimming needed."
+
+    adjusted_last_value = df['value'].iloc[-1]
+    last_point_difference = original_last_value - adjusted_last_value
+
+    return df, df_original, message, last_point_difference
+
+def calculate_bollinger_bands(df, std_dev_multiplier, window=10):
+    df_c = df.copy()
+    df_c['moving_avg'] = df_c['value'].rolling(window=window).mean()
+    df_c['std_dev'] = df_c['value'].rolling(window=window).std()
+    df_c['upper_band'] = df_c['moving_avg'] + (df_c['std_dev'] * std_dev_multiplier)
+    df_c['lower_band'] = df_c['moving_avg'] - (df_c['std_dev'] * std_dev_multiplier)
+    return df_c.dropna()
+
+def calculate_grouped_bollinger_bands(df, std_dev_multiplier, window=10, group_keys=('product', 'location'), dropna=True):
+    """
+    Computes Bollinger bands for every (product, location) series of a long frame in one grouped
+    rolling pass instead of one `calculate_bollinger_bands` call per group.
+
+    Returns the band frame (warm-up rows dropped, like `calculate_bollinger_bands`, unless
+    `dropna=False` keeps the row positions intact) and a boolean Series indexed by group telling
+    whether the last point of each series is above its upper band.
+    """
+    group_keys = list(group_keys)
+    df_c = df.reset_index(drop=True)
+    rolling = df_c.groupby(group_keys, sort=False, observed=True)['value'].rolling(window=window)
+    df_c['moving_avg'] = rolling.mean().reset_index(level=group_keys, drop=True)
+    df_c['std_dev'] = rolling.std().reset_index(level=group_keys, drop=True)
+    df_c['upper_band'] = df_c['moving_avg'] + (df_c['std_dev'] * std_dev_multiplier)
+    df_c['lower_band'] = df_c['moving_avg'] - (df_c['std_dev'] * std_dev_multiplier)
+    if dropna:
+        df_c = df_c.dropna()
+
+    last_points = df_c.groupby(group_keys, observed=True)[['value', 'upper_band']].last()
+    breaches = last_points['value'] > last_points['upper_band']
+    return df_c, breaches
+
+def find_products_needing_revision(breaches):
+    return [(product, location) for (product, location), breached in breaches.items() if breached]
+
+def calculate_differences(df_original, df_new):
+    df_diff = df_original.copy()
+    df_diff['value'] = df_new['value'] - df_original['value']
+    return df_diff
+
+def summarize_revisions(df_bb, breaches):
+    """
+    One row per breached series with its last point difference, sorted descending. Trimming scales
+    the last point down to the upper band, so the difference is read off the last rows directly
+    without trimming every series.
+    """
+    last_points = df_bb.groupby(['product', 'location'], observed=True)[['value', 'upper_band']].last()
+    last_points = last_points[breaches.reindex(last_points.index, fill_value=False)]
+    summary = (last_points['value'] - last_points['upper_band']).rename('last_point_difference')
+    return summary.sort_values(ascending=False, kind='stable').reset_index()
+
+def aggregate_revision_data(df_bb_dict, breaches):
+    revision_data = {}
+    for product, location in find_products_needing_revision(breaches):
+        df_new, df_original, _, last_point_difference = trim_values(df_bb_dict[(product, location)].copy())
+        revision_data[(product, location)] = (last_point_difference, df_original, df_new)
+    return dict(sorted(revision_data.items(), key=lambda item: item[1][0], reverse=True))
+
+def scan_revision_chunk(chunk, std_dev_multiplier=1, window=10):
+    """Worker for `aggregate_revision_data_parallel`: bands and trims every breached group of a chunk."""
+    group_keys = ['product', 'location']
+    df_bb, breaches = calculate_grouped_bollinger_bands(chunk, std_dev_multiplier, window, group_keys)
+    breached = pd.MultiIndex.from_frame(df_bb[group_keys]).isin(breaches.index[breaches])
+    df_original = df_bb[breached]
+    last_points = df_original.groupby(group_keys, sort=False, observed=True)[['value', 'upper_band']].transform('last')
+    df_new = df_original.copy()
+    df_new['value'] = df_original['value'] * (last_points['upper_band'] / last_points['value'])
+    return df_original, df_new
+
+def aggregate_revision_data_parallel(df, std_dev_multiplier=1, window=10, max_workers=None, chunk_size=1000, executor='process'):
+    """
+    Same result as `aggregate_revision_data`, but computed from the long frame in chunks of groups
+    on a process (or thread) pool. Chunks are merged back in a deterministic order before sorting.
+    """
+    results = run_chunked(scan_revision_chunk, df, max_workers=max_workers, chunk_size=chunk_size, executor=executor,
+                          std_dev_multiplier=std_dev_multiplier, window=window)
+    if not results:
+        return {}
+    originals = split_dataframe(pd.concat([df_original for df_original, _ in results]))
+    news = split_dataframe(pd.concat([df_new for _, df_new in results]))
+    revision_data = {}
+    for key, df_original in originals.items():
+        df_new = news[key]
+        revision_data[key] = (df_original['value'].iloc[-1] - df_new['value'].iloc[-1], df_original, df_new)
+    return dict(sorted(revision_data.items(), key=lambda item: item[1][0], reverse=True))
+
+def aggregate_all_data(sorted_revision_data):
+    all_data = []
+    for (product, location), (_, df_original, df_new) in sorted_revision_data.items():
+        temp_df = df_original.copy()
+        temp_df['difference'] = df_new['value'] - df_original['value']
+        temp_df['product'] = product
+        temp_df['location'] = location
+        all_data.append(temp_df)
+    return pd.concat(all_data, axis=0)
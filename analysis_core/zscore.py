@@ -0,0 +1,76 @@
+"""Rolling z-score computations used by z-score_control.py, importable without Plotly."""
+import pandas as pd
+
+from analysis_core.bands import split_dataframe
+from parallel_scan import run_chunked
+
+Z_SCORE_THRESHOLD = 1
+
+def calculate_z_scores(df):
+    df_c = df.copy()
+    df_c['mean'] = df_c['value'].rolling(window=10).mean()
+    df_c['std_dev'] = df_c['value'].rolling(window=10).std()
+    df_c['z_score'] = (df_c['value'] - df_c['mean']) / df_c['std_dev']
+    return df_c
+
+def calculate_grouped_z_scores(df, window=10, group_keys=('product', 'location')):
+    """Rolling z-scores for every series of a long frame in one grouped pass."""
+    group_keys = list(group_keys)
+    df_c = df.copy()
+    rolling = df_c.groupby(group_keys, sort=False, observed=True)['value'].rolling(window=window)
+    df_c['mean'] = rolling.mean().reset_index(level=group_keys, drop=True)
+    df_c['std_dev'] = rolling.std().reset_index(level=group_keys, drop=True)
+    df_c['z_score'] = (df_c['value'] - df_c['mean']) / df_c['std_dev']
+    return df_c
+
+def clip_tail_values(df, tail=8, z_score_trim=Z_SCORE_THRESHOLD, group_keys=None):
+    """
+    Caps the last `tail` values of a z-score frame at mean +/- z_score_trim * std_dev in one
+    vectorized step. With `group_keys` (e.g. ['product', 'location']) the tail is taken per group,
+    so a whole long-format frame can be trimmed at once.
+
+    Returns the trimmed copy and a boolean Series marking the clipped points.
+    """
+    df_trimmed = df.copy()
+    if group_keys is None:
+        # Rows counted from the end, like cumcount(ascending=False) below, so tail=0 marks nothing
+        in_tail = pd.Series(range(len(df_trimmed) - 1, -1, -1), index=df_trimmed.index) < tail
+    else:
+        in_tail = df_trimmed.groupby(group_keys, sort=False, observed=True).cumcount(ascending=False) < tail
+
+    upper = df_trimmed['mean'] + z_score_trim * df_trimmed['std_dev']
+    lower = df_trimmed['mean'] - z_score_trim * df_trimmed['std_dev']
+    clip_high = in_tail & (df_trimmed['z_score'] > z_score_trim)
+    clip_low = in_tail & (df_trimmed['z_score'] < -z_score_trim)
+
+    df_trimmed['value'] = df_trimmed['value'].astype(float).mask(clip_high, upper).mask(clip_low, lower)
+    return df_trimmed, clip_high | clip_low
+
+def trim_values(df, tail=8, z_score_trim=Z_SCORE_THRESHOLD):
+    df_trimmed, _ = clip_tail_values(df, tail, z_score_trim)
+    return df_trimmed
+
+def scan_chunk(chunk, window=10, tail=8, z_score_trim=Z_SCORE_THRESHOLD):
+    """Worker for `process_data_parallel`: z-scores a chunk of groups and trims the flagged ones."""
+    group_keys = ['product', 'location']
+    df_z = calculate_grouped_z_scores(chunk, window, group_keys)
+    groups = df_z.groupby(group_keys, sort=False, observed=True)
+    # Flag on the z-score of the actual last row, as `process_data` does; transform('last') would
+    # skip a trailing NaN and flag on an earlier point
+    last_breach = (groups.cumcount(ascending=False) == 0) & (df_z['z_score'] > z_score_trim)
+    flagged = last_breach.groupby([df_z[key] for key in group_keys], sort=False, observed=True).transform('any')
+    df_trimmed, _ = clip_tail_values(df_z[flagged], tail, z_score_trim, group_keys)
+    return df_trimmed
+
+def process_data_parallel(df, window=10, tail=8, z_score_trim=Z_SCORE_THRESHOLD,
+                          max_workers=None, chunk_size=1000, executor='process'):
+    """
+    Headless counterpart of `process_data` for large grids: groups are scanned in chunks on a
+    process (or thread) pool and merged back in (product, location) order. No plots are drawn.
+    """
+    results = run_chunked(scan_chunk, df, max_workers=max_workers, chunk_size=chunk_size, executor=executor,
+                          window=window, tail=tail, z_score_trim=z_score_trim)
+    results = [result for result in results if not result.empty]
+    if not results:
+        return {}
+    return split_dataframe(pd.concat(results))
@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+
+ALL_GROUPS = None
+
+
+class BandCache:
+    """
+    Thread-safe LRU cache for derived band data, keyed on
+    (kind, data_version, group, window, std_dev_multiplier).
+
+    One instance is meant to be shared by every dashboard session (see `get_band_cache` in
+    bollinger_band.py), so reruns and concurrent analysts reuse the same band frames, trim results
+    and revision lists. Entries computed from an older data version are dropped by `invalidate`.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(kind, data_version, group=ALL_GROUPS, window=10, std_dev_multiplier=1):
+        return kind, data_version, group, window, std_dev_multiplier
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Computed outside the lock so one slow entry does not block other sessions.
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, current_version=None):
+        """Drops every entry whose data version differs from `current_version` (all entries if None)."""
+        with self._lock:
+            for key in [key for key in self._entries if current_version is None or key[1] != current_version]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
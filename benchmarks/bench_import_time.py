@@ -0,0 +1,74 @@
+"""
+Cold-start benchmark for the repository's entry points.
+
+    python benchmarks/bench_import_time.py --repeat 5 --output import_times.json
+
+Imports each target in a fresh interpreter and records the median import time, the peak resident
+memory of the process and which heavy optional libraries (Plotly, Streamlit, SciPy, pyarrow,
+requests) ended up loaded. `analysis_core` is the compute-only entry point and should load none.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from common import ROOT
+
+TARGETS = {
+    'pandas': 'import pandas',
+    'analysis_core': 'import analysis_core',
+    'plot_analysis': "load_module('plot_analysis', 'plot_analysis.py')",
+    'test.py': "load_module('scratch_analysis', 'test.py')",
+    'airport_mapping': "load_module('airport_mapping', 'airport_mapping.py')",
+    'z-score_control': "load_module('z_score_control', 'z-score_control.py')",
+    'bollinger_band': "load_module('bollinger_band', 'bollinger_band.py')",
+}
+HEAVY_MODULES = ('plotly', 'streamlit', 'scipy', 'pyarrow', 'requests')
+
+PROBE = """
+import json, resource, sys, time
+sys.path.insert(0, {benchmarks!r})
+from common import load_module
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'seconds': seconds, 'max_rss_mb': rss_kb / 1024,
+                   'loaded': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure(statement, repeat):
+    code = PROBE.format(benchmarks=os.path.join(ROOT, 'benchmarks'), statement=statement, heavy=HEAVY_MODULES)
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    return {
+        'seconds': statistics.median(run['seconds'] for run in runs),
+        'max_rss_mb': max(run['max_rss_mb'] for run in runs),
+        'loaded': runs[-1]['loaded'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', nargs='+', default=list(TARGETS), choices=list(TARGETS), metavar='TARGET')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    results = []
+    for name in args.targets:
+        result = {'target': name, **measure(TARGETS[name], args.repeat)}
+        print(f"{name:<18} {result['seconds']:>8.3f}s {result['max_rss_mb']:>8.1f}MB  {', '.join(result['loaded']) or '-'}")
+        results.append(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Scaling benchmark for the chunked revision scans.
+
+    python benchmarks/bench_parallel_scan.py --series 16 1000 10000 100000 --workers 1 4 8
+
+Times `aggregate_revision_data_parallel` and `process_data_parallel` (analysis_core) for each series
+count and worker count on synthetic weekly data.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+import common  # noqa: F401 - puts the repository root on sys.path
+from analysis_core import aggregate_revision_data_parallel, process_data_parallel
+from synthetic_data import generate_series_frame
+
+
+def make_frame(n_series, n_weeks, seed=0):
+    n_locations = int(np.ceil(np.sqrt(n_series)))
+    df = generate_series_frame(int(np.ceil(n_series / n_locations)), n_locations, periods=n_weeks, seed=seed)
+    return df.iloc[:n_series * n_weeks]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--series', type=int, nargs='+', default=[16, 1000, 10000, 100000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count()])
+    parser.add_argument('--weeks', type=int, default=130)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--executor', choices=['process', 'thread'], default='process')
+    args = parser.parse_args()
+
+    scans = {
+        'bollinger': aggregate_revision_data_parallel,
+        'z_score': process_data_parallel,
+    }
+
+    print(f"{'scan':<10} {'series':>8} {'workers':>7} {'seconds':>9} {'series/s':>10}")
+    for n_series in args.series:
+        df = make_frame(n_series, args.weeks)
+        for name, scan in scans.items():
+            for workers in args.workers:
+                start = time.perf_counter()
+                scan(df, max_workers=workers, chunk_size=args.chunk_size, executor=args.executor)
+                elapsed = time.perf_counter() - start
+                print(f"{name:<10} {n_series:>8} {workers:>7} {elapsed:>9.3f} {n_series / elapsed:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
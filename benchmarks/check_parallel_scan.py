@@ -0,0 +1,79 @@
+"""
+Consistency check for the chunked revision scans against the serial per-series code.
+
+    python benchmarks/check_parallel_scan.py --series 40 --weeks 60 --executor thread
+
+Compares `aggregate_revision_data_parallel` with `aggregate_revision_data` and
+`process_data_parallel` with the loop in `process_data` (z-score_control.py) on synthetic data
+with outliers. A few series end in a missing value right after a high z-score, so a scan that
+flags on the last non-null point instead of the last row shows up. Exits non-zero on any
+difference in the flagged series or their trimmed values.
+"""
+import argparse
+import sys
+
+import numpy as np
+
+import common  # noqa: F401 - puts the repository root on sys.path
+from analysis_core import (
+    aggregate_revision_data, aggregate_revision_data_parallel, calculate_grouped_bollinger_bands,
+    calculate_z_scores, process_data_parallel, split_dataframe,
+)
+from analysis_core.zscore import trim_values
+from synthetic_data import generate_series_frame
+
+
+def make_frame(series, weeks, seed=0):
+    df = generate_series_frame(series, 1, periods=weeks, outlier_rate=0.05, integer=False, seed=seed)
+    # End every fourth series with an outlier followed by a missing value
+    last_rows = df.groupby('product', observed=True).tail(2).index.to_numpy().reshape(-1, 2)[::4]
+    df.loc[last_rows[:, 0], 'value'] *= 10
+    df.loc[last_rows[:, 1], 'value'] = np.nan
+    return df
+
+
+def serial_z_scores(df):
+    """The per-series selection of `process_data`, without the plots."""
+    trimmed = {}
+    for key, group in split_dataframe(df).items():
+        df_z = calculate_z_scores(group)
+        if df_z['z_score'].iloc[-1] > 1:
+            trimmed[key] = trim_values(df_z)
+    return trimmed
+
+
+def compare(name, expected, actual, value):
+    failures = 0
+    if sorted(expected) != sorted(actual):
+        print(f"{name}: flagged series differ: {sorted(set(expected) ^ set(actual))}")
+        failures += 1
+    for key in set(expected) & set(actual):
+        if not np.allclose(value(expected[key]), value(actual[key]), equal_nan=True):
+            print(f"{name}: trimmed values differ for {key}")
+            failures += 1
+    print(f"{name}: {len(expected)} flagged, {failures} mismatches")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--series', type=int, default=40)
+    parser.add_argument('--weeks', type=int, default=60)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--chunk-size', type=int, default=7)
+    parser.add_argument('--executor', choices=['process', 'thread'], default='thread')
+    args = parser.parse_args()
+
+    df = make_frame(args.series, args.weeks)
+    pool = dict(max_workers=args.workers, chunk_size=args.chunk_size, executor=args.executor)
+
+    df_bb, breaches = calculate_grouped_bollinger_bands(df, 1)
+    failures = compare('bollinger', aggregate_revision_data(split_dataframe(df_bb), breaches),
+                       aggregate_revision_data_parallel(df, **pool), lambda item: item[2]['value'].to_numpy())
+    failures += compare('z_score', serial_z_scores(df), process_data_parallel(df, **pool),
+                        lambda frame: frame['value'].to_numpy())
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
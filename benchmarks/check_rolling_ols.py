@@ -0,0 +1,62 @@
+"""
+Accuracy check for `rolling_ols` (test.py) against `scipy.stats.linregress`.
+
+    python benchmarks/check_rolling_ols.py --series 3 --rows 40 --window 10
+
+Builds a long frame sorted by (date, series), so the rows of every series are interleaved, and
+compares the slope, intercept and r2 of every complete window with a direct `linregress` fit.
+Exits non-zero if any value differs by more than `--tolerance` (relative).
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy.stats import linregress
+
+from common import load_module
+
+
+def interleaved_frame(series, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2021-01-03', periods=rows, freq='W')
+    return pd.DataFrame({
+        'date': np.repeat(dates, series),
+        'series': np.tile([f'Series {i + 1}' for i in range(series)], rows),
+        'value': rng.normal(size=rows * series).cumsum(),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--series', type=int, default=3)
+    parser.add_argument('--rows', type=int, default=40)
+    parser.add_argument('--window', type=int, default=10)
+    parser.add_argument('--tolerance', type=float, default=1e-9)
+    args = parser.parse_args()
+
+    scratch = load_module('scratch_analysis', 'test.py')
+    df = interleaved_frame(args.series, args.rows)
+    result = scratch.rolling_ols(df, args.window, 'date', 'value', group_column='series')
+
+    failures = 0
+    for name, rows in df.groupby('series'):
+        if not result.loc[rows.index[:args.window - 1]].isna().all().all():
+            print(f"{name}: warm-up rows are not NaN")
+            failures += 1
+        for end in range(args.window, len(rows) + 1):
+            window = rows.iloc[end - args.window:end]
+            expected = linregress(scratch.date_ordinals(window['date']), window['value'])
+            actual = result.loc[window.index[-1]]
+            for column, value in (('slope', expected.slope), ('intercept', expected.intercept),
+                                  ('r2', expected.rvalue ** 2)):
+                if not np.isclose(actual[column], value, rtol=args.tolerance, atol=0):
+                    print(f"{name} window ending {window['date'].iloc[-1]:%Y-%m-%d}: "
+                          f"{column} {actual[column]:.6g} != linregress {value:.6g}")
+                    failures += 1
+    print(f"{failures} mismatches")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
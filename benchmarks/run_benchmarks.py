@@ -0,0 +1,208 @@
+"""
+Benchmark harness for the repository's hot paths.
+
+    python benchmarks/run_benchmarks.py --rows 130 1040 --series 1 100 --output results.json
+    python benchmarks/run_benchmarks.py --baseline results.json --threshold 0.2
+
+Every case runs over a grid of (rows per series x series) on synthetic data and records the best
+wall time of `--repeat` runs, the peak traced memory of one extra run and the row throughput.
+Results go to a JSON file; with `--baseline` each case is compared against the stored result and
+the script exits non-zero if any case got slower by more than `--threshold` (0.2 = 20%).
+Everything runs offline.
+"""
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from common import load_module
+from analysis_core import bands, zscore
+from synthetic_data import generate_series_frame
+
+CASES = {}
+
+
+def case(name):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def series_frames(rows, series, seed=0):
+    df = generate_series_frame(series, 1, periods=rows, freq='D', seed=seed)
+    return [group[['date', 'value']].reset_index(drop=True) for _, group in df.groupby('product', observed=True)]
+
+
+def wide_frame(rows, series, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.integers(1, 100, size=(rows, series)).astype(float),
+                      columns=[f'metric_{i}' for i in range(series)])
+    df.insert(0, 'date_time', pd.date_range('2000-01-01', periods=rows, freq='D'))
+    return df
+
+
+def airport_csv(rows, series, seed=0):
+    rng = np.random.default_rng(seed)
+    n = rows * series
+    codes = [''.join(chr(ord('A') + x) for x in triple) for triple in rng.integers(0, 26, size=(n, 3))]
+    lon = rng.uniform(-180, 180, n).round(4)
+    lat = rng.uniform(-90, 90, n).round(4)
+    df = pd.DataFrame({'iata_code': codes, 'coordinates': [f'{x}, {y}' for x, y in zip(lon, lat)]})
+    return df.to_csv(index=False)
+
+
+@case('PlotAnalysis.perc_change')
+def perc_change_case(rows, series):
+    plot_analysis = load_module('plot_analysis', 'plot_analysis.py').PlotAnalysis()
+    frames = series_frames(rows, series)
+    return lambda: [plot_analysis.perc_change(df.copy(), 5) for df in frames]
+
+
+@case('PlotAnalysis.describe_df')
+def describe_df_case(rows, series):
+    plot_analysis = load_module('plot_analysis', 'plot_analysis.py').PlotAnalysis()
+    frames = series_frames(rows, series)
+    return lambda: [plot_analysis.describe_df(df) for df in frames]
+
+
+@case('calculate_bollinger_bands')
+def bollinger_case(rows, series):
+    frames = series_frames(rows, series)
+    return lambda: [bands.calculate_bollinger_bands(df, 1) for df in frames]
+
+
+@case('calculate_z_scores')
+def z_score_case(rows, series):
+    frames = series_frames(rows, series)
+    return lambda: [zscore.calculate_z_scores(df) for df in frames]
+
+
+@case('trim_values')
+def trim_case(rows, series):
+    frames = [zscore.calculate_z_scores(df) for df in series_frames(rows, series)]
+    return lambda: [zscore.trim_values(df) for df in frames]
+
+
+@case('get_pct_weights')
+def pct_weights_case(rows, series):
+    scratch = load_module('scratch_analysis', 'test.py')
+    df = wide_frame(rows, series)
+    return lambda: scratch.get_pct_weights(df.copy())
+
+
+@case('filter_only_quarterly')
+def quarterly_case(rows, series):
+    scratch = load_module('scratch_analysis', 'test.py')
+    df = wide_frame(rows, series)
+    return lambda: scratch.filter_only_quarterly(df.copy())
+
+
+@case('add_slope_column')
+def slope_case(rows, series):
+    scratch = load_module('scratch_analysis', 'test.py')
+    frames = series_frames(rows, series)
+    return lambda: [scratch.add_slope_column(df.copy(), 10) for df in frames]
+
+
+@case('parse_airport_codes')
+def airport_parse_case(rows, series):
+    airport_mapping = load_module('airport_mapping', 'airport_mapping.py')
+    text = airport_csv(rows, series)
+    return lambda: airport_mapping.parse_airport_codes(io.StringIO(text))
+
+
+@case('airport_locator')
+def airport_locator_case(rows, series):
+    airport_mapping = load_module('airport_mapping', 'airport_mapping.py')
+    airport_codes = airport_mapping.parse_airport_codes(io.StringIO(airport_csv(rows, series)))
+    codes = airport_codes['iata_code'].sample(100, replace=True, random_state=0).tolist()
+    return lambda: [airport_mapping.airport_locator(airport_codes, code) for code in codes]
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+def run(case_names, rows_grid, series_grid, repeat):
+    results = []
+    for name in case_names:
+        for rows in rows_grid:
+            for series in series_grid:
+                seconds, peak = measure(CASES[name](rows, series), repeat)
+                result = {
+                    'case': name,
+                    'rows': rows,
+                    'series': series,
+                    'seconds': seconds,
+                    'peak_mb': peak / 1e6,
+                    'rows_per_second': rows * series / seconds if seconds else float('inf'),
+                }
+                print(f"{name:<28} {rows:>8} {series:>6} {seconds:>10.4f}s {result['peak_mb']:>9.1f}MB "
+                      f"{result['rows_per_second']:>14,.0f} rows/s")
+                results.append(result)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns the results that are slower than their baseline entry by more than `threshold`."""
+    stored = {(r['case'], r['rows'], r['series']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        reference = stored.get((result['case'], result['rows'], result['series']))
+        if reference and result['seconds'] > reference['seconds'] * (1 + threshold):
+            regressions.append((result, reference))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=list(CASES), metavar='CASE')
+    parser.add_argument('--rows', type=int, nargs='+', default=[130, 1040])
+    parser.add_argument('--series', type=int, nargs='+', default=[1, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run(args.cases, args.rows, args.series, args.repeat)
+    with open(args.output, 'w') as f:
+        json.dump({
+            'meta': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'repeat': args.repeat,
+            },
+            'results': results,
+        }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for result, reference in regressions:
+            print(f"REGRESSION {result['case']} rows={result['rows']} series={result['series']}: "
+                  f"{reference['seconds']:.4f}s -> {result['seconds']:.4f}s")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
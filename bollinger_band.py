@@ -1,71 +1,36 @@
-import base64
-from datetime import datetime, timedelta
-import random
-
 import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
 
+from analysis_core.bands import (
+    calculate_differences, calculate_grouped_bollinger_bands, detect_bb_breach, find_products_needing_revision,
+    summarize_revisions, trim_values,
+)
+# Moved to analysis_core; still importable from here for code that used them before the move
+from analysis_core.bands import (  # noqa: F401
+    aggregate_all_data, aggregate_revision_data, calculate_bollinger_bands, split_dataframe,
+)
+from band_cache import ALL_GROUPS, BandCache
+from data_cache import GroupFrames, dataset_version, load_dataset
+from downsampling import DEFAULT_MAX_POINTS, downsample_frame
+from revision_export import export_file_name, export_to_tempfile, iter_revision_export_frames
+from synthetic_data import generate_series_frame
+
 # Global constants
 PRODUCTS = ['Product A', 'Product B', 'Product C', 'Product D']
 LOCATIONS = ['Location 1', 'Location 2', 'Location 3', 'Location 4']
 
-def create_dataframe(products, locations, date_range, future=False):
-    df = pd.DataFrame()
-
-    for product in products:
-        for location in locations:
-            dates = [date_range[0] + timedelta(weeks=i) for i in range((date_range[1]-date_range[0]).days//7+1)]
-            df_temp = pd.DataFrame({
-                'date': dates,
-                'product': [product for _ in range(len(dates))],
-                'location': [location for _ in range(len(dates))],
-                'value': [random.randint(1, 100) for _ in range(len(dates))],
-            })
-            df = pd.concat([df,df_temp], ignore_index=True)
-
-    return df
+def create_dataframe(products, locations, date_range, future=False, seed=None):
+    n_weeks = (date_range[1] - date_range[0]).days // 7 + 1
+    dates = pd.date_range(date_range[0], periods=n_weeks, freq='7D')
+    return generate_series_frame(products, locations, dates=dates, low=1, high=100, seed=seed)
 
 # Create past and future dataframes
 # df1 = create_dataframe(products, locations, [datetime.today() - timedelta(weeks=130), datetime.today()])
 
-def create_download_button(df, filename):
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()
-    button_id = f"download_button_{filename}"
-    return f'<a id="{button_id}" href="data:file/csv;base64,{b64}" download="{filename}.csv">Download {filename} Data</a>'
-
-def split_dataframe(df):
-    return {name: group for name, group in df.groupby(['product', 'location'])}
-
-def detect_bb_breach(df):
-    return df['value'].iloc[-1] > df['upper_band'].iloc[-1]
-
-def trim_values(df):
-    df_original = df.copy()
-    original_last_value = df['value'].iloc[-1]
-
-    if detect_bb_breach(df):
-        delta_percentage = df['upper_band'].iloc[-1] / df['value'].iloc[-1]
-        df['value'] *= delta_percentage
-        message = "Data points have been proportionally trimmed down."
-    else:
-        message = "The last data point has not passed the upper band, no trimming needed."
-
-    adjusted_last_value = df['value'].iloc[-1]
-    last_point_difference = original_last_value - adjusted_last_value
-
-    return df, df_original, message, last_point_difference
-
-def calculate_bollinger_bands(df, std_dev_multiplier):
-    df_c = df.copy()
-    df_c['moving_avg'] = df_c['value'].rolling(window=10).mean()
-    df_c['std_dev'] = df_c['value'].rolling(window=10).std()
-    df_c['upper_band'] = df_c['moving_avg'] + (df_c['std_dev'] * std_dev_multiplier)
-    df_c['lower_band'] = df_c['moving_avg'] - (df_c['std_dev'] * std_dev_multiplier)
-    return df_c.dropna()
-
-def plot_bollinger_bands(df, product, location, status):
+def plot_bollinger_bands(df, product, location, status, max_points=DEFAULT_MAX_POINTS):
+    # Long histories are downsampled; the bands use the same rows and breaches are always kept
+    df = downsample_frame(df, 'date', 'value', max_points, keep=df['value'] > df['upper_band'])
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=df.date, y=df['value'], mode='lines', name='value'))
     fig.add_trace(go.Scatter(x=df.date, y=df['upper_band'], fill=None, mode='lines', name='upper band'))
@@ -75,41 +40,50 @@ def plot_bollinger_bands(df, product, location, status):
     
     return fig
 
-def find_products_needing_revision(df_dict):
-    return [(product, location) for (product, location), df in df_dict.items() if detect_bb_breach(calculate_bollinger_bands(df, 1))]
+###############################################
 
-def calculate_differences(df_original, df_new):
-    df_diff = df_original.copy()
-    df_diff['value'] = df_new['value'] - df_original['value']
-    return df_diff
+@st.cache_resource
+def get_band_cache(maxsize=256):
+    # One cache per server process, shared by every session.
+    return BandCache(maxsize)
 
+def cached(kind, band_params, compute, group=ALL_GROUPS, cache=None):
+    data_version, window, std_dev_multiplier = band_params
+    key = BandCache.make_key(kind, data_version, group, window, std_dev_multiplier)
+    return (cache if cache is not None else get_band_cache()).get_or_compute(key, compute)
 
-###############################################
+def get_trimmed(df_bb_dict, band_params, key, cache=None):
+    return cached('trim', band_params, lambda: trim_values(df_bb_dict[key].copy()), group=key, cache=cache)
 
-def initialize_dashboard():
+def initialize_dashboard(std_dev_multiplier=1, window=10):
     st.title("Streamlit Bollinger Bands Dashboard")
-    df1 = pd.read_csv('hah.csv')
-    df1_dict = split_dataframe(df1)
-    products_for_revision = find_products_needing_revision(df1_dict)
+    df1, group_index = load_dataset('hah.csv')
+    data_version = dataset_version('hah.csv')
+    get_band_cache().invalidate(data_version)
+    band_params = (data_version, window, std_dev_multiplier)
+
+    df_bb, breaches = cached('bands', band_params,
+                             lambda: calculate_grouped_bollinger_bands(df1, std_dev_multiplier, window, dropna=False))
+    df_bb_dict = GroupFrames(df_bb, group_index, dropna=True)
+    products_for_revision = find_products_needing_revision(breaches)
     
     default_product, default_location = products_for_revision[0] if products_for_revision else (PRODUCTS[0], LOCATIONS[0])
 
-    return df1_dict, default_product, default_location, products_for_revision
+    return df_bb_dict, breaches, band_params, default_product, default_location, products_for_revision
 
-def display_product_location_selection(df1_dict, default_product, default_location, products_for_revision):
+def display_product_location_selection(df_bb_dict, band_params, default_product, default_location, products_for_revision):
     product_option = st.selectbox("Choose a product", PRODUCTS, index=PRODUCTS.index(default_product))
     location_option = st.selectbox("Choose a location", LOCATIONS, index=LOCATIONS.index(default_location))
 
     if (product_option, location_option) in products_for_revision:
         st.write(f"**Note:** {product_option} at {location_option} needs a revision.")
 
-    df = df1_dict[(product_option, location_option)]
-    df_bb = calculate_bollinger_bands(df, 1)
+    df_bb = df_bb_dict[(product_option, location_option)]
     fig = plot_bollinger_bands(df_bb, product_option, location_option, "Original")
     st.plotly_chart(fig)
 
     if detect_bb_breach(df_bb):
-        df_new, df_original, message, _ = trim_values(df_bb)
+        df_new, df_original, message, _ = get_trimmed(df_bb_dict, band_params, (product_option, location_option))
         st.write(message)
         fig_after = plot_bollinger_bands(df_new, product_option, location_option, "After Trimming")
         st.plotly_chart(fig_after)
@@ -118,37 +92,43 @@ def display_product_location_selection(df1_dict, default_product, default_locati
 
     st.write("---")  # Separator
 
-def display_aggregated_data(df1_dict):
+def display_aggregated_data(df_bb_dict, breaches, band_params, page_size=20, top_n=100):
     st.header("Part 2: Products & Locations needing revision")
     
-    # Aggregate data and create download links
-    revision_data = aggregate_revision_data(df1_dict)
-    all_data_df = aggregate_all_data(revision_data)
-    filename_aggregate = "aggregated_product_location_data"
-    download_link_aggregate = create_download_button(all_data_df, filename_aggregate)
-    st.markdown(download_link_aggregate, unsafe_allow_html=True)
-
-    for (product, location), (difference, df_original, df_new) in revision_data.items():
-        display_revision_data(product, location, df_original, df_new, difference)
+    # Cheap summary of every breach; frames, charts and downloads are only built for the current page
+    summary = cached('summary', band_params, lambda: summarize_revisions(df_bb_dict.df, breaches))
 
-def aggregate_revision_data(df1_dict):
-    revision_data = {}
-    for (product, location), df in df1_dict.items():
-        df_bb = calculate_bollinger_bands(df, 1)
-        if detect_bb_breach(df_bb):
-            df_new, df_original, _, last_point_difference = trim_values(df_bb)
-            revision_data[(product, location)] = (last_point_difference, df_original, df_new)
-    return dict(sorted(revision_data.items(), key=lambda item: item[1][0], reverse=True))
-
-def aggregate_all_data(sorted_revision_data):
-    all_data = []
-    for (product, location), (_, df_original, df_new) in sorted_revision_data.items():
-        temp_df = df_original.copy()
-        temp_df['difference'] = df_new['value'] - df_original['value']
-        temp_df['product'] = product
-        temp_df['location'] = location
-        all_data.append(temp_df)
-    return pd.concat(all_data, axis=0)
+    # Aggregate download, streamed group by group into a temp file only when the button is clicked
+    col1, col2 = st.columns(2)
+    with col1:
+        export_format = st.selectbox("Export format", ['csv', 'parquet'])
+    with col2:
+        compression = 'gzip' if export_format == 'csv' and st.checkbox("gzip") else None
+    revision_keys = list(zip(summary['product'], summary['location']))
+
+    def export_aggregate():
+        # Trimmed directly rather than through the shared cache, so an export of thousands of
+        # series does not evict the band and summary entries every session relies on
+        def get_revision(key):
+            df_new, df_original, _, _ = trim_values(df_bb_dict[key].copy())
+            return df_original, df_new
+        return export_to_tempfile(iter_revision_export_frames(revision_keys, get_revision), export_format, compression)
+
+    st.download_button("Download aggregated product location data", data=export_aggregate,
+                       file_name=export_file_name("aggregated_product_location_data", export_format, compression),
+                       on_click='ignore')
+
+    st.subheader(f"Top {min(top_n, len(summary))} of {len(summary)} by last data point difference")
+    st.dataframe(summary.head(top_n))
+
+    n_pages = max(1, -(-len(summary) // page_size))
+    page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1)
+    visible = summary.iloc[(page - 1) * page_size:page * page_size]
+
+    for product, location, difference in visible.itertuples(index=False):
+        key = (product, location)
+        df_new, df_original, _, _ = get_trimmed(df_bb_dict, band_params, key)
+        display_revision_data(product, location, df_original, df_new, difference)
 
 def display_revision_data(product, location, df_original, df_new, difference):
     st.write(f"**Product:** {product}, **Location:** {location}, **Last Data Point Difference:** {difference:.2f}")
@@ -168,13 +148,16 @@ def display_revision_data(product, location, df_original, df_new, difference):
         if st.button(f"Show/hide charts for {product} at {location}"):
             st.session_state[button_id] = not st.session_state[button_id]
     
-    # CSV Download Link for each product and location in the second column:
+    # CSV download for each product and location in the second column, generated on click:
     with col2:
-        differences_df = df_original.copy()
-        differences_df['difference'] = df_new['value'] - df_original['value']
+        def export_group():
+            differences_df = df_original.copy()
+            differences_df['difference'] = df_new['value'] - df_original['value']
+            return differences_df.to_csv(index=False)
+
         filename = f"{product}_{location}_data"
-        download_button = create_download_button(differences_df, filename)
-        st.markdown(download_button, unsafe_allow_html=True)
+        st.download_button(f"Download {filename} Data", data=export_group, file_name=f"{filename}.csv",
+                           mime='text/csv', key=f"download_{button_id}", on_click='ignore')
 
     # Show charts based on the current state
     if st.session_state[button_id]:
@@ -198,9 +181,9 @@ def display_revision_data(product, location, df_original, df_new, difference):
 
 # Main Execution
 def main():
-    df1_dict, default_product, default_location, products_for_revision = initialize_dashboard()
-    display_product_location_selection(df1_dict, default_product, default_location, products_for_revision)
-    display_aggregated_data(df1_dict)
+    df_bb_dict, breaches, band_params, default_product, default_location, products_for_revision = initialize_dashboard()
+    display_product_location_selection(df_bb_dict, band_params, default_product, default_location, products_for_revision)
+    display_aggregated_data(df_bb_dict, breaches, band_params)
     
 
 if __name__ == "__main__":
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import threading
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - the cache degrades to a plain CSV read
+    feather = None
+
+CACHE_DIR = '.data_cache'
+GROUP_KEYS = ('product', 'location')
+_REBUILD_LOCK = threading.Lock()
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_group_index(df, group_keys=GROUP_KEYS):
+    """
+    Returns {(product, location): (start, stop)} row ranges for a frame that is already sorted by
+    `group_keys`, found from the change points of the key columns instead of a groupby.
+    """
+    if df.empty:
+        return {}
+    keys = [df[key].to_numpy() for key in group_keys]
+    changed = np.zeros(len(df), dtype=bool)
+    changed[0] = True
+    for values in keys:
+        changed[1:] |= values[1:] != values[:-1]
+    starts = np.flatnonzero(changed)
+    stops = np.append(starts[1:], len(df))
+    return {tuple(values[start] for values in keys): (int(start), int(stop)) for start, stop in zip(starts, stops)}
+
+
+class GroupFrames(Mapping):
+    """
+    Read-only {(product, location): DataFrame} view over a group-sorted frame. Groups are sliced on
+    access, so building it costs nothing and only the groups actually used are materialized.
+    """
+
+    def __init__(self, df, group_index, dropna=False):
+        self.df = df
+        self.group_index = group_index
+        self.dropna = dropna
+
+    def __getitem__(self, key):
+        start, stop = self.group_index[key]
+        group = self.df.iloc[start:stop]
+        return group.dropna() if self.dropna else group
+
+    def __iter__(self):
+        return iter(self.group_index)
+
+    def __len__(self):
+        return len(self.group_index)
+
+
+def _read_source_csv(csv_path, group_keys):
+    df = pd.read_csv(csv_path, parse_dates=['date'])
+    for key in group_keys:
+        df[key] = df[key].astype('category')
+    return df.sort_values(list(group_keys), kind='stable').reset_index(drop=True)
+
+
+def _write_atomically(path, write):
+    """Writes through a temp file in the same directory and renames it over `path`, so readers never see a partial file."""
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.part'
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _write_meta(meta_path, meta):
+    def write(path):
+        with open(path, 'w') as f:
+            json.dump(meta, f)
+    _write_atomically(meta_path, write)
+
+
+def _rebuild_cache(csv_path, data_path, meta_path, stat, group_keys):
+    df = _read_source_csv(csv_path, group_keys)
+    _write_atomically(data_path, lambda path: feather.write_feather(df, path, compression='uncompressed'))
+    group_index = build_group_index(df, group_keys)
+    # Metadata goes last: it only ever describes a Feather file that is already complete
+    _write_meta(meta_path, {
+        'source': os.path.abspath(csv_path),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': file_sha256(csv_path),
+        'group_keys': list(group_keys),
+        'group_index': [[list(key), start, stop] for key, (start, stop) in group_index.items()],
+    })
+    return df, group_index
+
+
+def load_dataset(csv_path, cache_dir=CACHE_DIR, group_keys=GROUP_KEYS):
+    """
+    Loads `csv_path` through a typed Feather cache (categorical group keys, datetime dates, rows
+    sorted by group) and returns the frame with its persisted group index.
+
+    The cache is keyed on the source's mtime and size; when those change the file is re-hashed and
+    only re-converted if its SHA-256 differs. Cached loads memory-map the Feather file. Cache files
+    are replaced atomically and rebuilt by one thread at a time, so concurrent dashboard sessions
+    never read a half-written file.
+    """
+    group_keys = tuple(group_keys)
+    if feather is None:
+        df = _read_source_csv(csv_path, group_keys)
+        return df, build_group_index(df, group_keys)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    data_path = os.path.join(cache_dir, f'{stem}.feather')
+    meta_path = os.path.join(cache_dir, f'{stem}.json')
+
+    with _REBUILD_LOCK:
+        stat = os.stat(csv_path)
+        meta = None
+        if os.path.exists(meta_path) and os.path.exists(data_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get('group_keys') != list(group_keys):
+                meta = None
+            elif (meta['mtime_ns'], meta['size']) != (stat.st_mtime_ns, stat.st_size):
+                if meta['sha256'] == file_sha256(csv_path):
+                    meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                    _write_meta(meta_path, meta)
+                else:
+                    meta = None
+
+        if meta is None:
+            return _rebuild_cache(csv_path, data_path, meta_path, stat, group_keys)
+
+        try:
+            df = feather.read_table(data_path, memory_map=True).to_pandas()
+        except (OSError, ValueError):
+            # Unreadable cache file (e.g. left by an older writer): rebuild it from the CSV
+            return _rebuild_cache(csv_path, data_path, meta_path, stat, group_keys)
+    group_index = {tuple(key): (start, stop) for key, start, stop in meta['group_index']}
+    return df, group_index
+
+
+def dataset_version(csv_path, cache_dir=CACHE_DIR):
+    """Content hash of the source file, taken from the cache metadata when it is available."""
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    meta_path = os.path.join(cache_dir, f'{stem}.json')
+    if feather is not None and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            return json.load(f)['sha256']
+    return file_sha256(csv_path)
@@ -0,0 +1,98 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_POINTS = 5000
+
+
+def _as_float(values):
+    """
+    Float positions for x or y values. Datetimes (including tz-aware and date strings) become
+    nanoseconds; anything else that is not numeric falls back to the row number.
+    """
+    if isinstance(values, pd.DatetimeIndex):
+        return values.asi8.astype(np.float64)
+    values = np.asarray(values)
+    if values.dtype.kind in 'mM':
+        return values.astype('m8[ns]' if values.dtype.kind == 'm' else 'M8[ns]').astype(np.int64).astype(np.float64)
+    try:
+        return values.astype(np.float64)
+    except (TypeError, ValueError):
+        pass
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)    # Format inference on arbitrary strings
+            return pd.to_datetime(values, utc=True).asi8.astype(np.float64)
+    except (TypeError, ValueError, OverflowError):
+        return np.arange(len(values), dtype=np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: keeps the first and last points and, in each of n_out - 2 equal
+    buckets, the point forming the largest triangle with the previously kept point and the mean of
+    the next bucket. Preserves peaks and the visual shape of the line.
+    """
+    x, y = _as_float(x), _as_float(y)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_start, next_stop = stop, edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[next_start:next_stop].mean() if next_stop > next_start else x[-1]
+        next_y = np.nanmean(y[next_start:next_stop]) if next_stop > next_start else y[-1]
+        areas = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous])
+                       - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(np.nan_to_num(areas, nan=-1.0)))
+        indices[i + 1] = previous
+    return indices
+
+
+def minmax_indices(y, n_out):
+    """Keeps the minimum and maximum of each of n_out / 2 equal buckets (plus the end points)."""
+    y = _as_float(y)
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    bucket = np.arange(n) * (n_out // 2) // n
+    order = np.lexsort((np.nan_to_num(y, nan=np.inf), bucket))
+    first = np.flatnonzero(np.r_[True, bucket[order][1:] != bucket[order][:-1]])
+    last = np.r_[first[1:] - 1, n - 1]
+    return np.unique(np.r_[0, order[first], order[last], n - 1])
+
+
+def downsample_indices(x, y, max_points=DEFAULT_MAX_POINTS, method='lttb', keep=None):
+    """
+    Sorted row positions to plot for a series of more than `max_points` points. Positions where
+    the boolean `keep` mask is set (e.g. band breaches) are always included.
+    """
+    n = len(y)
+    if max_points is None or n <= max_points:
+        return np.arange(n)
+    if method == 'lttb':
+        indices = lttb_indices(x, y, max_points)
+    elif method == 'minmax':
+        indices = minmax_indices(y, max_points)
+    else:
+        raise ValueError(f"method must be 'lttb' or 'minmax', got {method!r}")
+    if keep is not None:
+        indices = np.union1d(indices, np.flatnonzero(np.asarray(keep, dtype=bool)))
+    return indices
+
+
+def downsample_frame(df, x, y_column, max_points=DEFAULT_MAX_POINTS, method='lttb', keep=None):
+    """
+    Rows of `df` selected by `downsample_indices` on `y_column`. All other columns (e.g. band
+    envelopes) are taken at the same positions so they stay aligned with the value line.
+    `x` is a column name or an array of x values (e.g. the index).
+    """
+    x_values = df[x].to_numpy() if isinstance(x, str) else np.asarray(x)
+    if isinstance(keep, pd.Series):
+        keep = keep.to_numpy()
+    return df.iloc[downsample_indices(x_values, df[y_column].to_numpy(), max_points, method, keep)]
@@ -0,0 +1,80 @@
+import numpy as np
+
+
+class HistogramSketch:
+    """
+    Fixed-edge histogram that can be updated incrementally and merged across series.
+
+    Values are binned with NumPy on the server so a chart only needs the bin counts. Sketches with
+    the same edges add up exactly, so per-series sketches built in separate jobs (or days) can be
+    combined; values outside the edges are counted in `underflow` / `overflow`.
+    """
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    @classmethod
+    def from_range(cls, low, high, bins=50):
+        return cls(np.linspace(low, high, bins + 1))
+
+    @classmethod
+    def from_values(cls, values, bins='auto'):
+        values = _finite(values)
+        sketch = cls(np.histogram_bin_edges(values, bins=bins) if len(values) else np.array([0.0, 1.0]))
+        return sketch.update(values)
+
+    def update(self, values):
+        values = _finite(values)
+        counts, _ = np.histogram(values, bins=self.edges)
+        self.counts += counts
+        self.underflow += int(np.count_nonzero(values < self.edges[0]))
+        self.overflow += int(np.count_nonzero(values > self.edges[-1]))
+        return self
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Only sketches with identical bin edges can be merged")
+        merged = HistogramSketch(self.edges)
+        merged.counts = self.counts + other.counts
+        merged.underflow = self.underflow + other.underflow
+        merged.overflow = self.overflow + other.overflow
+        return merged
+
+    @property
+    def total(self):
+        return int(self.counts.sum()) + self.underflow + self.overflow
+
+    @property
+    def centers(self):
+        return (self.edges[:-1] + self.edges[1:]) / 2
+
+    @property
+    def widths(self):
+        return np.diff(self.edges)
+
+    def quantile(self, q):
+        """Approximate quantile(s) of the in-range values, interpolating linearly inside a bin."""
+        cumulative = np.concatenate(([0], np.cumsum(self.counts)))
+        if cumulative[-1] == 0:
+            return np.full(np.shape(q), np.nan)
+        return np.interp(np.asarray(q) * cumulative[-1], cumulative, self.edges)
+
+    def to_dict(self):
+        return {'edges': self.edges.tolist(), 'counts': self.counts.tolist(),
+                'underflow': self.underflow, 'overflow': self.overflow}
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls(state['edges'])
+        sketch.counts = np.asarray(state['counts'], dtype=np.int64)
+        sketch.underflow = state['underflow']
+        sketch.overflow = state['overflow']
+        return sketch
+
+
+def _finite(values):
+    values = np.asarray(values, dtype=np.float64).ravel()
+    return values[np.isfinite(values)]
@@ -0,0 +1,39 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+
+EXECUTORS = {'process': ProcessPoolExecutor, 'thread': ThreadPoolExecutor}
+
+
+def split_into_group_chunks(df, group_keys, chunk_size):
+    """
+    Splits a long-format frame into chunks of whole groups, `chunk_size` groups per chunk.
+    Groups are ordered by key and rows keep their original order inside a group, so the chunks
+    (and anything merged back from them) come out in a deterministic order.
+    """
+    codes = df.groupby(list(group_keys), sort=True, observed=True).ngroup().to_numpy()
+    order = np.argsort(codes, kind='stable')
+    df_sorted = df.iloc[order]
+    codes_sorted = codes[order]
+    n_groups = codes_sorted[-1] + 1 if len(codes_sorted) else 0
+    bounds = np.searchsorted(codes_sorted, np.arange(0, n_groups, chunk_size))
+    bounds = np.append(bounds, len(codes_sorted))
+    return [df_sorted.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def run_chunked(func, df, group_keys=('product', 'location'), max_workers=None, chunk_size=1000, executor='process', **kwargs):
+    """
+    Applies `func(chunk, **kwargs)` to every group chunk of `df` on a process or thread pool and
+    returns the per-chunk results in chunk order. `max_workers=1` runs inline without a pool.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor must be one of {sorted(EXECUTORS)}, got {executor!r}")
+    chunks = split_into_group_chunks(df, group_keys, chunk_size)
+    worker = partial(func, **kwargs)
+    max_workers = max_workers or os.cpu_count()
+    if max_workers == 1 or len(chunks) <= 1:
+        return [worker(chunk) for chunk in chunks]
+    with EXECUTORS[executor](max_workers=min(max_workers, len(chunks))) as pool:
+        return list(pool.map(worker, chunks))
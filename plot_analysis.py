@@ -1,9 +1,12 @@
-import plotly.graph_objects as go
-import plotly.express as px
 import pandas as pd
 import numpy as np
 
+from downsampling import DEFAULT_MAX_POINTS, downsample_frame
+from histogram_sketch import HistogramSketch
+
 class PlotAnalysis:
+    PERCENTILES = [.001,.01,.05,.1,.15,.25,.5,.75,.85,.90,.95,.99,.999]
+
     def __init__(self):
         pass
 
@@ -15,14 +18,63 @@ class PlotAnalysis:
 
     def perc_change(self, df, horizon, column_index=1, keep_only_perc_change=True):
         horizon = horizon-1
-        df['perc_change'] = df.iloc[:,column_index].pct_change(periods=horizon,fill_method='ffill').round(decimals=4)
+        df = df.assign(perc_change=df.iloc[:,column_index].ffill().pct_change(periods=horizon).round(decimals=4))
         if keep_only_perc_change ==True:
-            return df.drop(df.columns[1],axis=1).dropna()
+            return df.drop(df.columns[column_index],axis=1).dropna()
         else:
             return df.dropna()
 
+    def perc_change_batch(self, df, horizons, columns=None, date_column_index=0, layout='wide'):
+        """
+        Percentage change of many columns over many horizons in one pass, without modifying `df`.
+
+        Horizons follow `perc_change`: a horizon of h compares each row with the row h-1 steps
+        earlier, after forward-filling gaps. All columns are read into one float64 array and every
+        horizon is a single vectorized division over it.
+
+        Args:
+            df: A DataFrame with a date column and numerical columns.
+            horizons: List of horizons, e.g. [2, 5, 20, 60].
+            columns: Columns to use. Defaults to every numeric column except the date column.
+            date_column_index: Position of the date column.
+            layout: 'wide' returns the date column plus one `<column>_perc_change_<h>` column per
+                (column, horizon), NaN where the horizon reaches before the first row. 'long' returns
+                tidy (date, column, horizon, perc_change) rows with those NaNs dropped.
+        """
+        date_column = df.columns[date_column_index]
+        if columns is None:
+            columns = [col for col in df.select_dtypes('number').columns if col != date_column]
+        values = df[columns].ffill().to_numpy(dtype=np.float64)
+        n_rows, n_columns = values.shape
+
+        result = np.full((n_rows, n_columns * len(horizons)), np.nan)
+        for i, horizon in enumerate(horizons):
+            periods = horizon - 1
+            block = result[:, i * n_columns:(i + 1) * n_columns]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if periods == 0:
+                    block[:] = np.where(np.isnan(values), np.nan, 0.0)
+                elif periods < n_rows:
+                    block[periods:] = values[periods:] / values[:-periods] - 1
+        result = result.round(4)
+
+        if layout == 'wide':
+            names = [f'{col}_perc_change_{horizon}' for horizon in horizons for col in columns]
+            wide = pd.DataFrame(result, columns=names, index=df.index)
+            wide.insert(0, date_column, df[date_column])
+            return wide
+        if layout == 'long':
+            long = pd.DataFrame({
+                date_column: np.tile(np.repeat(df[date_column].to_numpy(), n_columns), len(horizons)),
+                'column': np.tile(np.asarray(columns, dtype=object), n_rows * len(horizons)),
+                'horizon': np.repeat(np.asarray(horizons), n_rows * n_columns),
+                'perc_change': result.reshape(n_rows, len(horizons), n_columns).transpose(1, 0, 2).ravel(),
+            })
+            return long.dropna(subset=['perc_change']).reset_index(drop=True)
+        raise ValueError(f"layout must be 'wide' or 'long', got {layout!r}")
+
     def describe_df(self, df, column_index=1):
-        return df.iloc[:,column_index].describe(percentiles = [.001,.01,.05,.1,.15,.25,.5,.75,.85,.90,.95,.99,.999]).round(2).reset_index()
+        return df.iloc[:,column_index].describe(percentiles = self.PERCENTILES).round(2).reset_index()
 
     def describe_df_forecast(self, df, input_value, column_index=1):
         describe = self.describe_df(df, column_index)
@@ -30,18 +82,90 @@ class PlotAnalysis:
         describe['forecast_value'] = input_value * (1+describe.iloc[:,column_index]/100).round(3)
         return describe
 
-    def plot_describe_df(self, describe_df):
+    def describe_df_forecast_batch(self, df, input_values, group_columns, value_column, percentiles=None):
+        """
+        `describe_df_forecast` for every series of a long frame at once.
+
+        The values of all series are sorted once (by series, then value) and every percentile of
+        every series is read off that array with the same linear interpolation as `describe`, so the
+        cost is a single O(n log n) sort regardless of the number of series.
+
+        Args:
+            df: Long DataFrame with one row per (series, observation).
+            input_values: Input value per series: a Series/dict keyed like the groups (tuples for
+                several group columns), or an array in sorted group order.
+            group_columns: Column name or list of column names identifying a series.
+            value_column: Column holding the percentage values to describe.
+            percentiles: Defaults to the percentiles used by `describe_df`.
+        Returns:
+            A tidy DataFrame with the group columns, `stat` (count, mean, std, min, percentiles, max,
+            labelled like `describe`), `value`, `input_value` and `forecast_value`.
+        """
+        percentiles = np.asarray(self.PERCENTILES if percentiles is None else percentiles, dtype=np.float64)
+        group_columns = [group_columns] if isinstance(group_columns, str) else list(group_columns)
+        data = df.loc[df[value_column].notna(), group_columns + [value_column]]
+        codes, groups = pd.MultiIndex.from_frame(data[group_columns]).factorize(sort=True)
+        groups = groups.set_names(group_columns)
+        values = data[value_column].to_numpy(dtype=np.float64)
+        n_groups = len(groups)
+
+        order = np.lexsort((values, codes))
+        values, codes = values[order], codes[order]
+        counts = np.bincount(codes, minlength=n_groups)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        means = np.bincount(codes, weights=values, minlength=n_groups) / counts
+        squared_deviations = np.bincount(codes, weights=(values - means[codes]) ** 2, minlength=n_groups)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stds = np.sqrt(squared_deviations / (counts - 1))
+
+        positions = percentiles[None, :] * (counts[:, None] - 1)
+        lower = np.floor(positions).astype(np.int64)
+        upper = np.ceil(positions).astype(np.int64)
+        low_values = values[starts[:, None] + lower]
+        high_values = values[starts[:, None] + upper]
+        quantiles = low_values + (positions - lower) * (high_values - low_values)
+
+        stats = np.column_stack((counts, means, stds, values[starts], quantiles, values[starts + counts - 1])).round(2)
+        labels = ['count', 'mean', 'std', 'min'] + [f'{p * 100:g}%' for p in percentiles] + ['max']
+
+        if isinstance(input_values, (pd.Series, dict)):
+            input_values = pd.Series(input_values)
+            if len(group_columns) == 1:
+                keys = groups.get_level_values(0)
+            else:
+                keys = groups
+                input_values.index = pd.MultiIndex.from_tuples(input_values.index)
+            input_values = input_values.reindex(keys).to_numpy(dtype=np.float64)
+        input_values = np.broadcast_to(np.asarray(input_values, dtype=np.float64), (n_groups,))
+
+        result = groups.to_frame(index=False).loc[np.repeat(np.arange(n_groups), len(labels))].reset_index(drop=True)
+        result['stat'] = np.tile(labels, n_groups)
+        result['value'] = stats.ravel()
+        result['input_value'] = np.repeat(input_values, len(labels))
+        result['forecast_value'] = result['input_value'] * (1 + result['value'] / 100).round(3)
+        return result
+
+    def plot_describe_df(self, describe_df, show=True):
+        import plotly.graph_objects as go
+
         fig = go.Figure(data=[go.Table(header=dict(values=describe_df.columns.tolist()),
                         cells=dict(values=[describe_df.iloc[:,0].tolist(), 
                                            describe_df.iloc[:,1].tolist(),
                                            ]))])
-        fig.show()
+        if show:
+            fig.show()
+        return fig
+
+    def plot_ts_line_chart(self, df, y_values=None, max_points=DEFAULT_MAX_POINTS, show=True):
+        import plotly.graph_objects as go
 
-    def plot_ts_line_chart(self, df, y_values=None):
         if df.index.name is None: 
-            trace = go.Scatter(x=df.iloc[:,0], y=df.iloc[:,1], mode='lines')
+            plotted = downsample_frame(df, df.iloc[:,0].to_numpy(), df.columns[1], max_points)
+            trace = go.Scatter(x=plotted.iloc[:,0], y=plotted.iloc[:,1], mode='lines')
         else:
-            trace = go.Scatter(x=df.index, y=df.iloc[:,1], mode='lines')
+            plotted = downsample_frame(df, df.index.to_numpy(), df.columns[1], max_points)
+            trace = go.Scatter(x=plotted.index, y=plotted.iloc[:,1], mode='lines')
         data = [trace]
 
         if y_values is not None:
@@ -51,35 +175,41 @@ class PlotAnalysis:
 
         layout = go.Layout(title='Time Series Data Movement', xaxis_title='Date', yaxis_title='Value')
         fig = go.Figure(data=data, layout=layout)
-        fig.show()
+        if show:
+            fig.show()
+        return fig
+
+    def plot_count_frequency_histogram(self, df, column_index=1, second_window=None, show_latest_value=True, bins='auto', show=True):
+        import plotly.graph_objects as go
 
-    def plot_count_frequency_histogram(self, df, column_index=1, second_window=None, show_latest_value=True):
         fig = go.Figure()
         second_column_dt = df.iloc[:, column_index].dtype
-        if second_column_dt != np.dtype('int64') and second_column_dt != np.dtype('float64'):
+        if not pd.api.types.is_numeric_dtype(second_column_dt) or pd.api.types.is_bool_dtype(second_column_dt):
             raise Exception("The data type of the second column is not integer or float. Please make sure the second column is an integer or float.")
         else:
-            value_column = df.iloc[:, column_index].values.tolist()
-            fig.add_trace(go.Histogram(x=value_column,
-                                       name='all records',
-                                       marker_color='#330C73',
-                                       opacity=0.75))
+            # Bin on the server with shared edges; the chart only receives bin counts
+            value_column = df.iloc[:, column_index].to_numpy(dtype=np.float64)
+            all_records = HistogramSketch.from_values(value_column, bins=bins)
+            fig.add_trace(go.Bar(x=all_records.centers, y=all_records.counts, width=all_records.widths,
+                                 name='all records',
+                                 marker_color='#330C73',
+                                 opacity=0.75))
 
             if second_window is not None:
-                latest_perc_change_l = value_column[-second_window:]
-                fig.add_trace(go.Histogram(x=latest_perc_change_l,
-                                           name='last {}'.format(second_window),
-                                           marker_color='#EB89B5',
-                                           opacity=0.9))
+                latest_window = HistogramSketch(all_records.edges).update(value_column[-second_window:])
+                fig.add_trace(go.Bar(x=latest_window.centers, y=latest_window.counts, width=latest_window.widths,
+                                     name='last {}'.format(second_window),
+                                     marker_color='#EB89B5',
+                                     opacity=0.9))
             else:
                 pass
 
             if show_latest_value:
-                cur_per_change = value_column[-1:]
-                fig.add_trace(go.Histogram(x=cur_per_change,
-                                           name='latest',
-                                           marker_color='#FF0000',
-                                           opacity=1))
+                latest = HistogramSketch(all_records.edges).update(value_column[-1:])
+                fig.add_trace(go.Bar(x=latest.centers, y=latest.counts, width=latest.widths,
+                                     name='latest',
+                                     marker_color='#FF0000',
+                                     opacity=1))
             else:
                 pass
 
@@ -89,4 +219,6 @@ class PlotAnalysis:
                 xaxis_title_text='Value',
                 yaxis_title_text='Frequency Count',
             )
-            fig.show()
+            if show:
+                fig.show()
+            return fig
@@ -0,0 +1,57 @@
+import html
+import os
+
+from parallel_scan import EXECUTORS
+
+
+def figure_json(fig):
+    import plotly.io as pio
+
+    return pio.to_json(fig, validate=False, pretty=False)
+
+
+def serialize_figures(figures, max_workers=None, executor='process', chunksize=16):
+    """Serializes figures to Plotly JSON on a process (or thread) pool, keeping their order."""
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor must be one of {sorted(EXECUTORS)}, got {executor!r}")
+    if max_workers == 1 or len(figures) <= 1:
+        return [figure_json(fig) for fig in figures]
+    with EXECUTORS[executor](max_workers=max_workers or os.cpu_count()) as pool:
+        if executor == 'process':
+            return list(pool.map(figure_json, figures, chunksize=chunksize))
+        return list(pool.map(figure_json, figures))
+
+
+def build_html_report(sections, path, title='Report', max_workers=None, executor='process'):
+    """
+    Writes one self-contained HTML file with every figure in `sections`.
+
+    Args:
+        sections: List of (heading, [figures]) pairs, e.g. one pair per flagged series.
+        path: Output file.
+        title: Page title.
+        max_workers, executor: Pool used to serialize the figures in parallel.
+    Returns:
+        `path`. The Plotly JS bundle is embedded once and every figure is a div plus a
+        `Plotly.newPlot` call on its serialized JSON.
+    """
+    from plotly.offline import get_plotlyjs
+
+    figures = [fig for _, section_figures in sections for fig in section_figures]
+    specs = iter(serialize_figures(figures, max_workers, executor))
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>{html.escape(title)}</title>\n')
+        f.write(f'<script type="text/javascript">{get_plotlyjs()}</script>\n</head>\n<body>\n')
+        f.write(f'<h1>{html.escape(title)}</h1>\n')
+        figure_id = 0
+        for heading, section_figures in sections:
+            f.write(f'<h2>{html.escape(str(heading))}</h2>\n')
+            for _ in section_figures:
+                spec = next(specs).replace('</', '<\\/')
+                f.write(f'<div id="fig-{figure_id}"></div>\n')
+                f.write(f'<script type="text/javascript">(function() {{ var spec = {spec}; '
+                        f'Plotly.newPlot("fig-{figure_id}", spec.data, spec.layout, {{responsive: true}}); }})();</script>\n')
+                figure_id += 1
+        f.write('</body>\n</html>\n')
+    return path
@@ -0,0 +1,77 @@
+import gzip
+import tempfile
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - Parquet export needs pyarrow, CSV does not
+    pa = pq = None
+
+EXPORT_FORMATS = ('csv', 'parquet')
+
+
+def revision_export_frame(product, location, df_original, df_new):
+    """The per-series export layout: the original band frame plus the trim difference."""
+    export_df = df_original.copy()
+    export_df['difference'] = df_new['value'] - df_original['value']
+    export_df['product'] = product
+    export_df['location'] = location
+    return export_df
+
+
+def iter_revision_export_frames(revision_keys, get_revision):
+    """
+    Yields one export frame per (product, location) in `revision_keys`, calling
+    `get_revision(key) -> (df_original, df_new)` lazily so only one series is held at a time.
+    """
+    for product, location in revision_keys:
+        df_original, df_new = get_revision((product, location))
+        yield revision_export_frame(product, location, df_original, df_new)
+
+
+def write_csv(frames, fileobj, compression=None):
+    """Streams frames to a binary file object as one CSV, writing the header once."""
+    out = gzip.GzipFile(fileobj=fileobj, mode='wb') if compression == 'gzip' else fileobj
+    header = True
+    for frame in frames:
+        out.write(frame.to_csv(index=False, header=header).encode())
+        header = False
+    if out is not fileobj:
+        out.close()
+
+
+def write_parquet(frames, fileobj, compression=None):
+    """Streams frames to a Parquet file, one row group per frame."""
+    if pq is None:
+        raise ImportError("Parquet export requires pyarrow")
+    writer = None
+    for frame in frames:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(fileobj, table.schema, compression=compression or 'snappy')
+        writer.write_table(table.cast(writer.schema))
+    if writer is not None:
+        writer.close()
+
+
+def export_to_tempfile(frames, fmt='csv', compression=None):
+    """
+    Writes frames group by group into a temporary file and returns it open for reading, so the
+    concatenated export never exists in memory. The file is deleted when it is closed.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"fmt must be one of {EXPORT_FORMATS}, got {fmt!r}")
+    fileobj = tempfile.TemporaryFile()
+    if fmt == 'csv':
+        write_csv(frames, fileobj, compression)
+    else:
+        write_parquet(frames, fileobj, compression)
+    fileobj.seek(0)
+    return fileobj
+
+
+def export_file_name(filename, fmt='csv', compression=None):
+    suffix = '.csv' if fmt == 'csv' else '.parquet'
+    if fmt == 'csv' and compression == 'gzip':
+        suffix += '.gz'
+    return filename + suffix
@@ -0,0 +1,139 @@
+import json
+import math
+from collections import deque
+
+
+class RollingWindowState:
+    """
+    Streaming mean/std over the last `window` points of one series.
+
+    Appending a value updates the window statistics in O(1) with a windowed Welford update, so
+    a weekly job can extend bands and z-scores without re-running `rolling()` over the full
+    history. The statistics match pandas `rolling(window).mean()` / `.std()` (sample std, ddof=1),
+    and are NaN until the window is full. A window of identical values has std_dev 0 and z-score
+    NaN (or +/-inf for a value off the window mean).
+    """
+
+    def __init__(self, window=10, values=()):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._updates = 0
+        self._repeats = 0
+        for value in values:
+            self.append(value)
+
+    def append(self, value):
+        value = float(value)
+        self._repeats = self._repeats + 1 if self.values and value == self.values[-1] else 1
+        if len(self.values) < self.window:
+            self.values.append(value)
+            delta = value - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (value - self.mean)
+        else:
+            old_value = self.values[0]
+            self.values.append(value)
+            old_mean = self.mean
+            self.mean += (value - old_value) / self.window
+            self.m2 += (value - old_value) * (value - self.mean + old_value - old_mean)
+            self.m2 = max(self.m2, 0.0)
+        self._updates += 1
+        if self._updates >= self.window:
+            self._recompute()
+        return self.snapshot()
+
+    def _recompute(self):
+        # Re-derive the statistics from the window once per `window` updates, so rounding error
+        # from the incremental updates stays bounded however long the state lives
+        self.mean = math.fsum(self.values) / len(self.values)
+        self.m2 = math.fsum((value - self.mean) ** 2 for value in self.values)
+        self._updates = 0
+
+    @property
+    def is_ready(self):
+        return len(self.values) == self.window
+
+    @property
+    def last_value(self):
+        return self.values[-1] if self.values else math.nan
+
+    @property
+    def is_flat(self):
+        return self._repeats >= self.window
+
+    @property
+    def moving_avg(self):
+        if not self.is_ready:
+            return math.nan
+        return self.values[-1] if self.is_flat else self.mean
+
+    @property
+    def std_dev(self):
+        if not self.is_ready or self.window < 2:
+            return math.nan
+        # A window of identical values has exactly zero spread, as in pandas
+        return 0.0 if self.is_flat else math.sqrt(self.m2 / (self.window - 1))
+
+    def bands(self, std_dev_multiplier=1):
+        return (self.moving_avg + self.std_dev * std_dev_multiplier,
+                self.moving_avg - self.std_dev * std_dev_multiplier)
+
+    def z_score(self, value=None):
+        value = self.last_value if value is None else value
+        deviation, std_dev = value - self.moving_avg, self.std_dev
+        if std_dev == 0:
+            # Same as the pandas division: +/-inf off a flat window, NaN on it
+            return math.copysign(math.inf, deviation) if deviation else math.nan
+        return deviation / std_dev
+
+    def snapshot(self, std_dev_multiplier=1):
+        """Returns the latest point's statistics, using the same column names as the band/z-score frames."""
+        upper_band, lower_band = self.bands(std_dev_multiplier)
+        return {
+            'value': self.last_value,
+            'moving_avg': self.moving_avg,
+            'std_dev': self.std_dev,
+            'upper_band': upper_band,
+            'lower_band': lower_band,
+            'z_score': self.z_score(),
+            'breach': self.last_value > upper_band,
+        }
+
+    def to_dict(self):
+        return {'window': self.window, 'values': list(self.values)}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state['window'], state['values'])
+
+
+def build_states(df_dict, window=10):
+    """Seeds one state per (product, location) group from the tail of its history."""
+    return {key: RollingWindowState(window, df['value'].iloc[-window:]) for key, df in df_dict.items()}
+
+
+def append_points(states, new_points, std_dev_multiplier=1, window=10):
+    """
+    Appends one new value per series and returns the updated statistics per group.
+    `new_points` maps (product, location) to the new value.
+    """
+    results = {}
+    for key, value in new_points.items():
+        state = states.get(key)
+        if state is None:
+            state = states[key] = RollingWindowState(window)
+        state.append(value)
+        results[key] = state.snapshot(std_dev_multiplier)
+    return results
+
+
+def save_states(states, path):
+    with open(path, 'w') as f:
+        json.dump([{'key': list(key), **state.to_dict()} for key, state in states.items()], f)
+
+
+def load_states(path):
+    with open(path) as f:
+        return {tuple(item['key']): RollingWindowState.from_dict(item) for item in json.load(f)}
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+
+def _labels(spec, prefix):
+    if isinstance(spec, int):
+        return [f'{prefix} {i + 1}' for i in range(spec)]
+    return list(spec)
+
+
+def generate_series_frame(products=4, locations=4, periods=130, freq='W', start='2021-01-03', dates=None,
+                          low=1, high=100, trend=0.0, seasonality=0.0, season_length=52,
+                          outlier_rate=0.0, outlier_scale=3.0, integer=True, seed=None):
+    """
+    Builds a long-format (date, product, location, value) frame for every product x location
+    series in a single allocation, for load testing the band, z-score and revision code.
+
+    Args:
+        products, locations: Either a count (labels become 'Product 1', 'Location 1', ...) or a list of labels.
+        periods, freq, start: Calendar of each series, passed to `pd.date_range`. Ignored if `dates` is given.
+        low, high: Bounds of the uniform base noise (inclusive, like `random.randint`).
+        trend: Added per period, so the last point of a series is `trend * (periods - 1)` above the first.
+        seasonality, season_length: Amplitude and period of a sine wave added to every series.
+        outlier_rate, outlier_scale: Fraction of points multiplied by `outlier_scale`.
+        integer: Round values to integers.
+        seed: Seed for `np.random.default_rng`.
+    Returns:
+        A DataFrame sorted by product, location and date, with categorical product/location columns.
+    Example:
+        df = generate_series_frame(products=1000, locations=50, periods=260, trend=0.1, outlier_rate=0.01, seed=0)
+    """
+    rng = np.random.default_rng(seed)
+    product_labels = _labels(products, 'Product')
+    location_labels = _labels(locations, 'Location')
+    if dates is None:
+        dates = pd.date_range(start, periods=periods, freq=freq)
+    dates = pd.DatetimeIndex(dates)
+    n_series = len(product_labels) * len(location_labels)
+    n_dates = len(dates)
+
+    values = rng.integers(low, high + 1, size=(n_series, n_dates)).astype(np.float64)
+    steps = np.arange(n_dates)
+    if trend:
+        values += trend * steps
+    if seasonality:
+        values += seasonality * np.sin(2 * np.pi * steps / season_length)
+    if outlier_rate:
+        values[rng.random(values.shape) < outlier_rate] *= outlier_scale
+    if integer:
+        values = np.rint(values).astype(np.int64)
+
+    series = np.arange(n_series)
+    return pd.DataFrame({
+        'date': np.tile(dates.values, n_series),
+        'product': pd.Categorical.from_codes(np.repeat(series // len(location_labels), n_dates), product_labels),
+        'location': pd.Categorical.from_codes(np.repeat(series % len(location_labels), n_dates), location_labels),
+        'value': values.ravel(),
+    })
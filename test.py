@@ -1,27 +1,58 @@
-def plot_smooth_multiple_time_series_plotly(dfs, names=None, resample_freq='D'):
-    fig = go.Figure()
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from downsampling import DEFAULT_MAX_POINTS, downsample_frame
+
+
+def align_series(dfs, names=None, resample_freq='D') -> pd.DataFrame:
+    """
+    Puts N (date, value) frames onto one shared calendar grid and interpolates them together.
+
+    All series are joined into a single wide frame on the union of their dates, interpolated in time
+    as one 2-D block (only inside each series' own date range), and sampled at `resample_freq`. The
+    input frames are not modified.
+
+    Args:
+        dfs: DataFrames whose first column is the date and second column the value.
+        names: Column name per series. Defaults to 'Time Series 1', 'Time Series 2', ...
+        resample_freq: Frequency of the shared grid.
+    Returns:
+        A wide DataFrame with a 'date' column followed by one column per series.
+    """
+    names = names or [f'Time Series {i+1}' for i in range(len(dfs))]
+    series = []
+    for name, df in zip(names, dfs):
+        values = pd.Series(df.iloc[:, 1].to_numpy(dtype=float), index=pd.to_datetime(df.iloc[:, 0]), name=name)
+        if not values.index.is_unique:
+            values = values.groupby(level=0).mean()
+        series.append(values)
+    wide = pd.concat(series, axis=1).sort_index()
+
+    # The bin labels `resample` would give, so anchored frequencies ('W', 'M', 'MS', ...) work too
+    grid = pd.Series(0, index=wide.index[[0, -1]]).resample(resample_freq).size().index
+    wide = wide.reindex(wide.index.union(grid)).interpolate(method='time', limit_area='inside').reindex(grid)
+    wide.index.name = 'date'
+    return wide.reset_index()
 
-    for i, df in enumerate(dfs):
-        # Assign a unique name for each trace
-        if names:
-            trace_name = names[i]
-        else:
-            trace_name = f'Time Series {i+1}'
+def plot_smooth_multiple_time_series_plotly(dfs, names=None, resample_freq='D', max_points=DEFAULT_MAX_POINTS, show=True):
+    import plotly.graph_objects as go
 
-        # Use the first and second columns by indexing
-        date_col = df.columns[0]
-        value_col = df.columns[1]
+    fig = go.Figure()
 
-        # Set the date column as the index and resample with interpolation
-        df.set_index(date_col, inplace=True)
-        df_resampled = df.resample(resample_freq).interpolate(method='linear')
-        df_resampled.reset_index(inplace=True)
+    # One aligned, interpolated frame for all series instead of a resample per series
+    aligned = align_series(dfs, names, resample_freq)
 
-        # Use the original column names when accessing the resampled dataframe
-        fig.add_trace(go.Scatter(x=df_resampled[date_col], y=df_resampled[value_col], mode='lines', name=trace_name))
+    for trace_name in aligned.columns[1:]:
+        series = aligned[['date', trace_name]].dropna()
+        series = downsample_frame(series, 'date', trace_name, max_points)
+        fig.add_trace(go.Scatter(x=series['date'], y=series[trace_name], mode='lines', name=trace_name))
 
     fig.update_layout(title='Smooth Multiple Time Series Line Chart', xaxis_title='Date', yaxis_title='Value')
-    fig.show()
+    if show:
+        fig.show()
+    return fig
 
 
 
@@ -50,13 +81,50 @@ def get_pct_weights(df: pd.DataFrame) -> pd.DataFrame:
         # 2023-04-04         32.03     4.69     63.28
         # 2023-04-05         22.22    33.33     44.44
     """
-    df.set_index(df.columns[0], inplace=True)
-    non_date_columns = df.columns    # Get a list of non-date column names
-    df['row_sum'] = df[non_date_columns].sum(axis=1)    # Calculate the row sum
-    for column in non_date_columns:    # Calculate the percentage weight of each non-date column
-        df[f'{column}_pct'] = (df[column] / df['row_sum']) * 100
-    df_pct = df[[f'{column}_pct' for column in non_date_columns]]  # Create a new DataFrame with percentage weights
-    return df_pct.round(2)
+    return row_shares(df)
+
+def _divide_shares(values, totals, percent, dtype):
+    shares = np.full(values.shape, np.nan, dtype=dtype)
+    np.divide(values, totals, out=shares, where=totals != 0)    # Zero-sum rows/groups stay NaN
+    if percent:
+        shares *= 100
+    return shares
+
+def row_shares(df: pd.DataFrame, date_column=None, percent=True, decimals=2, dtype=np.float64) -> pd.DataFrame:
+    """
+    Share of each numerical column in its row total, computed as one broadcast division over a
+    single NumPy block. Returns a new DataFrame indexed by the date column; the input is not modified.
+
+    Args:
+        df: A DataFrame containing a date column and numerical columns.
+        date_column: Name of the date column. Defaults to the first column.
+        percent: Return percentages (x100) instead of fractions.
+        decimals: Round to this many decimals; None to skip rounding.
+        dtype: Output dtype, e.g. np.float32 to halve memory on wide frames.
+    Returns:
+        A DataFrame with one `<column>_pct` column per numerical column. Missing cells are left out
+        of the row total (as `DataFrame.sum` does) and stay NaN; rows summing to zero are NaN.
+    """
+    date_column = df.columns[0] if date_column is None else date_column
+    value_columns = [col for col in df.columns if col != date_column]
+    values = df[value_columns].to_numpy(dtype=dtype)
+    shares = _divide_shares(values, np.nansum(values, axis=1, keepdims=True), percent, dtype)
+    if decimals is not None:
+        shares = shares.round(decimals)
+    return pd.DataFrame(shares, columns=[f'{col}_pct' for col in value_columns], index=pd.Index(df[date_column], name=date_column))
+
+def group_shares(df: pd.DataFrame, by, value_column, percent=True, decimals=2, dtype=np.float64) -> pd.DataFrame:
+    """
+    Share of each row's `value_column` in the total of its `by` group, e.g. the share of each location
+    within its product for by='product'. Returns a copy of `df` with a `<value_column>_pct` column;
+    groups summing to zero are NaN.
+    """
+    values = df[value_column].to_numpy(dtype=dtype)
+    totals = df.groupby(by, sort=False, observed=True)[value_column].transform('sum').to_numpy(dtype=dtype)
+    shares = _divide_shares(values, totals, percent, dtype)
+    if decimals is not None:
+        shares = shares.round(decimals)
+    return df.assign(**{f'{value_column}_pct': shares})
 
 def filter_only_quarterly(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -82,32 +150,141 @@ def filter_only_quarterly(df: pd.DataFrame) -> pd.DataFrame:
     result = filter_only_quarterly(sample_df)
 
     """
-    date_column = df.columns[0]  # Get the first column name
-    df[date_column] = pd.to_datetime(df[date_column])  # Convert date column to datetime type
-    df.set_index(date_column, inplace=True)  # Set date column as the index
-    def last_non_null(s):  # Custom function to get the last non-null value in a group
-        return s.dropna().iloc[-1]   # Custom function to get the last non-null value in a group-1]
-    quarterly_data = df.resample('Q').agg(last_non_null)    # Find the last non-null value of each quarter in the DataFrame
-    quarterly_data.reset_index(inplace=True)    # Reset the index to make the date column a regular column
-    quarterly_data['quarter'] = quarterly_data[date_column].dt.to_period("Q").astype(str)    # Add a column indicating the calendar quarter
+    quarterly_data = resample_period_end(df, freq='Q', how='last')    # Last non-null value of each quarter, NaN for empty quarters
+    quarterly_data['quarter'] = quarterly_data[df.columns[0]].dt.to_period("Q").astype(str)    # Add a column indicating the calendar quarter
     return quarterly_data 
 
+def resample_period_end(df: pd.DataFrame, freq='Q', how='last', date_column=None, group_column=None) -> pd.DataFrame:
+    """
+    Reduces every numerical column to one value per calendar period with a single cythonized
+    groupby, and returns a new DataFrame (the input is not modified).
+
+    Args:
+        df: A DataFrame with a date column and numerical columns.
+        freq: Period frequency, e.g. 'M', 'Q' or 'Y'.
+        how: 'last' or 'first' (last/first non-null value of the period), 'max' or 'mean'.
+        date_column: Name of the date column. Defaults to the first column.
+        group_column: Optional entity column of a long-format (entity, date, ...) frame; every entity
+            is reduced separately in the same pass.
+    Returns:
+        A DataFrame with (group_column,) the period end date in the date column and the reduced
+        columns. Periods without data between an entity's first and last date are kept as NaN rows.
+    """
+    if how not in ('last', 'first', 'max', 'mean'):
+        raise ValueError(f"how must be one of 'last', 'first', 'max', 'mean', got {how!r}")
+    date_column = df.columns[0] if date_column is None else date_column
+    periods = pd.PeriodIndex(pd.to_datetime(df[date_column]), freq=freq)
+    keys = pd.Series(0, index=df.index) if group_column is None else df[group_column]
+    value_columns = [col for col in df.columns if col not in (date_column, group_column)]
+
+    reduced = df[value_columns].groupby([keys.to_numpy(), periods], sort=True).agg(how)
+
+    # Reindex each entity onto every period between its first and last one, so empty periods are NaN
+    entity_codes, entities = pd.factorize(reduced.index.get_level_values(0), sort=True)
+    ordinals = reduced.index.get_level_values(1).asi8
+    first = pd.Series(ordinals).groupby(entity_codes).min().to_numpy()
+    last = pd.Series(ordinals).groupby(entity_codes).max().to_numpy()
+    lengths = last - first + 1
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    all_periods = pd.period_range(pd.Period(ordinal=first.min(), freq=freq), pd.Period(ordinal=last.max(), freq=freq), freq=freq) \
+        if len(first) else pd.PeriodIndex([], freq=freq)
+    full_index = pd.MultiIndex.from_arrays([
+        np.repeat(entities.to_numpy(), lengths),
+        all_periods[np.repeat(first, lengths) + offsets - (first.min() if len(first) else 0)],
+    ])
+    reduced = reduced.reindex(full_index)
+
+    result = reduced.reset_index(drop=True)
+    result.insert(0, date_column, full_index.get_level_values(1).to_timestamp(how='end').normalize())
+    if group_column is not None:
+        result.insert(0, group_column, full_index.get_level_values(0))
+    return result
+
+
+def date_ordinals(dates) -> np.ndarray:
+    """Vectorized equivalent of mapping `datetime.toordinal` over a date column."""
+    days = pd.to_datetime(dates).to_numpy().astype('datetime64[D]').astype(np.int64)
+    return days + datetime.date(1970, 1, 1).toordinal()
+
+def rolling_ols(df: pd.DataFrame, window: int, date_column=None, value_column=None, group_column=None) -> pd.DataFrame:
+    """
+    Rolling least-squares fit of value against ordinal date over the last `window` rows, computed
+    from windowed cumulative sums so the cost is O(n) whatever the window size.
+
+    Args:
+        df: A DataFrame with a date column and a value column (the first two columns by default).
+        window: Number of rows in each regression window.
+        date_column: Name of the date column. Defaults to the first column.
+        value_column: Name of the value column. Defaults to the second column.
+        group_column: Optional column (or list of columns) identifying separate series in a long frame;
+            windows never cross series boundaries. Series may be interleaved, but the rows of each
+            series must be in date order.
+    Returns:
+        A DataFrame aligned with `df` with `slope`, `intercept` (against the proleptic ordinal date)
+        and `r2` columns, NaN until a series has `window` rows.
+    """
+    date_column = df.columns[0] if date_column is None else date_column
+    value_column = df.columns[1] if value_column is None else value_column
+    x = date_ordinals(df[date_column]).astype(float)
+    y = df[value_column].to_numpy(dtype=float)
+
+    if group_column is None:
+        group_codes = np.zeros(len(df), dtype=np.int64)
+        order = np.arange(len(df))
+    else:
+        group_codes = df.groupby(group_column, sort=False, observed=True).ngroup().to_numpy()
+        # Series may be interleaved (e.g. a frame sorted by date, then group); the windowed sums
+        # below need each series' rows to be contiguous, so work in group order and scatter back
+        order = np.argsort(group_codes, kind='stable')
+        x, y, group_codes = x[order], y[order], group_codes[order]
+    position = pd.Series(group_codes).groupby(group_codes).cumcount().to_numpy()
+
+    # Shift x and y per series so the running sums stay small and do not lose precision
+    x_ref = pd.Series(x).groupby(group_codes).transform('first').to_numpy()
+    y_ref = pd.Series(y).groupby(group_codes).transform('mean').to_numpy()
+    xs = x - x_ref
+    ys = y - y_ref
+
+    def window_sum(values):
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        sums = np.full(len(values), np.nan)
+        end = np.arange(window, len(values) + 1)
+        sums[window - 1:] = cumulative[end] - cumulative[end - window]
+        return sums
+
+    sx, sy = window_sum(xs), window_sum(ys)
+    sxx, syy, sxy = window_sum(xs * xs), window_sum(ys * ys), window_sum(xs * ys)
+    cov = window * sxy - sx * sy
+    var_x = window * sxx - sx * sx
+    var_y = window * syy - sy * sy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = cov / var_x
+        intercept = (sy - slope * sx) / window + y_ref - slope * x_ref
+        r2 = cov * cov / (var_x * var_y)
+
+    incomplete = position < window - 1
+    result = np.empty((len(df), 3))
+    for i, values in enumerate((slope, intercept, r2)):
+        values[incomplete] = np.nan
+        result[order, i] = values
+    return pd.DataFrame(result, columns=['slope', 'intercept', 'r2'], index=df.index)
 
 def add_slope_column(df, window):
-    df['date_ordinal'] = pd.to_datetime(df.iloc[:,0]).map(datetime.datetime.toordinal)
-    df.reset_index(drop=True, inplace=True)
-    # df = df.drop(df.columns[0], axis=1)  #drop the date column since we will use date_ordinal instead
-    x_axis = 'date_ordinal'
-    df.index = df.iloc[:,1] #df[y_axis] this should be the value column
-    df['slope'] = df[x_axis].rolling(window=window).apply(lambda x_axis: linregress(x_axis, x_axis.index)[0])
-    return df.reset_index(drop=True).dropna()
+    df = df.reset_index(drop=True)
+    df['date_ordinal'] = date_ordinals(df.iloc[:,0])
+    df['slope'] = rolling_ols(df, window, date_column=df.columns[0], value_column=df.columns[1])['slope']
+    return df.dropna()
 
 def get_slope(df):
+    from scipy.stats import linregress  # SciPy takes most of a second to import; only this helper needs it
+
     df['date_ordinal'] = pd.to_datetime(df.iloc[:,0]).map(datetime.datetime.toordinal)
     slope, intercept, _, _, _ = linregress(df['date_ordinal'], df.iloc[:,1])
     return slope, intercept
 
-def plot_time_series_with_slope_plotly_single(df):
+def plot_time_series_with_slope_plotly_single(df, show=True):
+    import plotly.graph_objects as go
+
     slope, intercept = get_slope(df)
     
     fig = go.Figure()
@@ -116,4 +293,6 @@ def plot_time_series_with_slope_plotly_single(df):
     fig.add_trace(go.Scatter(x=df['date'], y=df['date_ordinal'].map(lambda x: slope * x + intercept), mode='lines', name='Slope', line=dict(dash='dot', color='red')))
 
     fig.update_layout(title='Time Series with Slope Overlay', xaxis_title='Date', yaxis_title='Value')
-    fig.show()
+    if show:
+        fig.show()
+    return fig
@@ -1,45 +1,26 @@
 import pandas as pd
-import plotly.graph_objs as go
-import random
 from datetime import datetime, timedelta
-from itertools import product
+
+from analysis_core.bands import split_dataframe
+from analysis_core.zscore import Z_SCORE_THRESHOLD, calculate_z_scores, trim_values
+from downsampling import DEFAULT_MAX_POINTS, downsample_frame
+from report import build_html_report
+from synthetic_data import generate_series_frame
 
 # Global constants
 PRODUCTS = ['Product A', 'Product B', 'Product C', 'Product D']
 LOCATIONS = ['Location 1', 'Location 2', 'Location 3', 'Location 4']
-Z_SCORE_THRESHOLD = 1
 NUM_WEEKS = 130
 
-def create_dataframe(products, locations, date_range):
+def create_dataframe(products, locations, date_range, seed=None):
     dates = pd.date_range(date_range[0], date_range[1], freq='W')
-    data = []
-    for prod, loc in product(products, locations):
-        data.extend([(date, prod, loc, random.randint(1, 100)) for date in dates])
-    return pd.DataFrame(data, columns=['date', 'product', 'location', 'value'])
-
-def split_dataframe(df):
-    return {name: group for name, group in df.groupby(['product', 'location'])}
-
-def calculate_z_scores(df):
-    df_c = df.copy()
-    df_c['mean'] = df_c['value'].rolling(window=10).mean()
-    df_c['std_dev'] = df_c['value'].rolling(window=10).std()
-    df_c['z_score'] = (df_c['value'] - df_c['mean']) / df_c['std_dev']
-    return df_c
-
-def trim_values(df):
-    df_trimmed = df.copy()
-    z_score_trim = Z_SCORE_THRESHOLD
-    for i in range(-8, 0):
-        mean = df_trimmed['mean'].iloc[i]
-        std_dev = df_trimmed['std_dev'].iloc[i]
-        if df_trimmed['z_score'].iloc[i] > z_score_trim:
-            df_trimmed['value'].iloc[i] = mean + z_score_trim * std_dev
-        elif df_trimmed['z_score'].iloc[i] < -z_score_trim:
-            df_trimmed['value'].iloc[i] = mean - z_score_trim * std_dev
-    return df_trimmed
-
-def plot_timeseries(df, product, location, status):
+    return generate_series_frame(products, locations, dates=dates, low=1, high=100, seed=seed)
+
+def plot_timeseries(df, product, location, status, max_points=DEFAULT_MAX_POINTS, show=True):
+    import plotly.graph_objs as go
+
+    keep = df['z_score'].abs() > Z_SCORE_THRESHOLD if 'z_score' in df else None
+    df = downsample_frame(df, 'date', 'value', max_points, keep=keep)
     fig = go.Figure()
     # Split the data into two parts based on the specified date
     mask = df['date'] < datetime(2023, 8, 1)
@@ -57,13 +38,16 @@ def plot_timeseries(df, product, location, status):
                                   mode='lines', line=dict(color='blue'), showlegend=False))
 
     fig.update_layout(title=f"{product}, {location} - {status}", xaxis_title='Date', yaxis_title='Value')
-    fig.show()
+    if show:
+        fig.show()
+    return fig
 
 
-def plot_z_scores(df, product, location):
+def plot_z_scores(df, product, location, max_points=DEFAULT_MAX_POINTS, show=True):
     import plotly.graph_objs as go
     from plotly.subplots import make_subplots
 
+    df = downsample_frame(df, 'date', 'z_score', max_points, keep=df['z_score'].abs() > Z_SCORE_THRESHOLD)
     fig = make_subplots()
 
     # Z-score line
@@ -75,20 +59,36 @@ def plot_z_scores(df, product, location):
 
     fig.update_layout(title=f"{product}, {location} - Z-Scores", xaxis_title='Date', yaxis_title='Z-Score', showlegend=True)
 
-    fig.show()
-
-def process_data(df_dict):
+    if show:
+        fig.show()
+    return fig
+
+def process_data(df_dict, render='show', report_path='z_score_report.html', max_workers=None):
+    """
+    Z-scores every series, trims the flagged ones and plots them.
+
+    With render='show' every chart opens via `fig.show()`. With render='report' nothing is shown:
+    the charts are collected and written to one HTML report at `report_path`, serialized on
+    `max_workers` processes, which is the mode for batch jobs.
+    """
+    if render not in ('show', 'report'):
+        raise ValueError(f"render must be 'show' or 'report', got {render!r}")
+    show = render == 'show'
     trimmed_dataframes = {}
+    sections = []
     for (product, location), df in df_dict.items():
         df_z = calculate_z_scores(df)
         if df_z['z_score'].iloc[-1] > 1:
             print(f"{product} at {location} needs a revision.")
-            plot_timeseries(df_z, product, location, "Before Trimming")
-            plot_z_scores(df_z, product, location)
+            fig_before = plot_timeseries(df_z, product, location, "Before Trimming", show=show)
+            fig_z = plot_z_scores(df_z, product, location, show=show)
             df_trimmed = trim_values(df_z)
-            plot_timeseries(df_trimmed, product, location, "After Trimming")
+            fig_after = plot_timeseries(df_trimmed, product, location, "After Trimming", show=show)
             trimmed_dataframes[(product, location)] = df_trimmed
+            sections.append((f"{product}, {location}", [fig_before, fig_z, fig_after]))
 
+    if not show:
+        build_html_report(sections, report_path, title='Z-Score Revisions', max_workers=max_workers)
     return trimmed_dataframes
 
 def main():
@@ -98,4 +98,5 @@ def main():
     trimmed_dataframes = process_data(df_dict)
     # You can now use or analyze the trimmed_dataframes as needed
 
-main()
+if __name__ == "__main__":
+    main()